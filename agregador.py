@@ -0,0 +1,156 @@
+"""
+agregador.py – Semáforos y totales compartidos por el CSV y la API
+===================================================================
+process_data.py y servidor.py le pasan las tareas y las horas de Clockify
+registro a registro. Los totales por proyecto y por cliente se mantienen al
+día en cada alta/actualización/baja, así que cambiar una tarea actualiza los
+KPIs en O(1) sin recorrer el árbol.
+
+Las horas de Jira se acumulan en centésimas enteras: sumar y restar no
+arrastra error de punto flotante por más actualizaciones que haya.
+"""
+
+from mapeos import CW_TO_JIRA, JIRA_TO_CLIENT
+
+
+# ── Semáforos ───────────────────────────────────────────────────────────────
+# fecha_fin / fecha_real / hoy pueden ser date o datetime, siempre del mismo tipo
+
+def semaforo_fecha(fecha_fin, fecha_real, es_finalizado, hoy):
+    if not fecha_fin:
+        return "gris"
+    if es_finalizado:
+        if not fecha_real:
+            return "verde"
+        return "verde" if (fecha_real - fecha_fin).days <= 0 else "rojo"
+    restantes = (fecha_fin - hoy).days
+    return "rojo" if restantes < 0 else ("amarillo" if restantes <= 7 else "verde")
+
+def semaforo_horas(est, cons, es_finalizado):
+    if est is None or cons is None:
+        return "gris"
+    if cons > est:
+        return "rojo"
+    if not es_finalizado and est > 0 and cons / est >= 0.8:
+        return "amarillo"
+    return "verde"
+
+def horas_consumidas(trabajadas, est, pend):
+    """Si Jira no trae tiempo trabajado se infiere de estimado - restante."""
+    if trabajadas is None and est is not None and pend is not None:
+        return round(est - pend, 2)
+    return trabajadas
+
+
+# ── Agregador ───────────────────────────────────────────────────────────────
+
+def _centi(h):
+    return round(h * 100) if h else 0
+
+def _horas(c):
+    # Sin horas cargadas queda el 0 entero, como la suma original
+    return c / 100 if c else 0
+
+
+class Agregador:
+
+    def __init__(self):
+        self.tasks     = {}   # id → (cliente, proyecto, Tarea)
+        self.projects  = {}   # cliente → {proyecto → {id → Tarea}} (orden de llegada)
+        self.proj_tot  = {}   # (cliente, proyecto) → [est, cons, pend] en centésimas
+        self.cli_tot   = {}   # cliente → [est, cons, pend, n_tareas] (est/cons/pend en centésimas)
+        self.cw_proj   = {}   # proyecto Jira → {"total": h, "users": {user: h}}
+        self.cw_client = {}   # cliente → {"total": h}
+        self.cw_n      = {}   # ("p", proyecto) / ("u", proyecto, user) / ("c", cliente) → n° de entradas
+
+    # ── Jira ────────────────────────────────────────────────────────
+    def _sumar(self, cliente, proyecto, tarea, signo):
+        est, cons, pend = (signo * _centi(tarea.horas_estimadas), signo * _centi(tarea.horas_consumidas),
+                           signo * _centi(tarea.horas_pendientes))
+        tot = self.proj_tot.setdefault((cliente, proyecto), [0, 0, 0])
+        tot[0] += est; tot[1] += cons; tot[2] += pend
+        cli = self.cli_tot.setdefault(cliente, [0, 0, 0, 0])
+        cli[0] += est; cli[1] += cons; cli[2] += pend; cli[3] += signo
+
+    def upsert(self, cliente, proyecto, tarea, en_su_lugar=False):
+        """Alta o actualización de una tarea (por id); ajusta los totales. Una tarea
+        actualizada pasa al final (el orden es el de llegada), salvo que con
+        `en_su_lugar` siga en el mismo proyecto: ahí conserva su lugar."""
+        prev = self.tasks.get(tarea.id)
+        if prev and (not en_su_lugar or prev[:2] != (cliente, proyecto)):
+            self.remove(tarea.id)
+        elif prev:
+            self._sumar(cliente, proyecto, prev[2], -1)
+        self.tasks[tarea.id] = (cliente, proyecto, tarea)
+        self.projects.setdefault(cliente, {}).setdefault(proyecto, {})[tarea.id] = tarea
+        self._sumar(cliente, proyecto, tarea, 1)
+
+    def remove(self, task_id):
+        cliente, proyecto, tarea = self.tasks.pop(task_id)
+        tareas = self.projects[cliente][proyecto]
+        del tareas[task_id]
+        self._sumar(cliente, proyecto, tarea, -1)
+        if not tareas:
+            del self.projects[cliente][proyecto], self.proj_tot[(cliente, proyecto)]
+            if not self.projects[cliente]:
+                del self.projects[cliente], self.cli_tot[cliente]
+
+    # ── Clockify ────────────────────────────────────────────────────
+    def add_time(self, cw_proyecto, user, horas, cliente=None):
+        """Suma una entrada de Clockify a su proyecto de Jira (según CW_TO_JIRA) y a
+        su cliente; `cliente` se usa si el proyecto no está mapeado."""
+        jira_proj = CW_TO_JIRA.get(cw_proyecto)
+        if jira_proj:
+            d = self.cw_proj.setdefault(jira_proj, {"total": 0, "users": {}})
+            d["total"]      += horas
+            d["users"][user] = d["users"].get(user, 0) + horas
+            self._contar(("p", jira_proj), 1)
+            self._contar(("u", jira_proj, user), 1)
+            cliente = JIRA_TO_CLIENT.get(jira_proj, cliente)
+        if cliente:
+            self.cw_client.setdefault(cliente, {"total": 0})["total"] += horas
+            self._contar(("c", cliente), 1)
+
+    def remove_time(self, cw_proyecto, user, horas, cliente=None):
+        """Resta una entrada sumada con add_time (con los mismos mapeos); un proyecto,
+        usuario o cliente que se queda sin entradas desaparece, como si nunca hubiera estado."""
+        jira_proj = CW_TO_JIRA.get(cw_proyecto)
+        if jira_proj:
+            d = self.cw_proj[jira_proj]
+            d["total"]       -= horas
+            d["users"][user] -= horas
+            if not self._contar(("u", jira_proj, user), -1):
+                del d["users"][user]
+            if not self._contar(("p", jira_proj), -1):
+                del self.cw_proj[jira_proj]
+            cliente = JIRA_TO_CLIENT.get(jira_proj, cliente)
+        if cliente:
+            self.cw_client[cliente]["total"] -= horas
+            if not self._contar(("c", cliente), -1):
+                del self.cw_client[cliente]
+
+    def _contar(self, clave, n):
+        n = self.cw_n[clave] = self.cw_n.get(clave, 0) + n
+        if not n:
+            del self.cw_n[clave]
+        return n
+
+    # ── Lectura ─────────────────────────────────────────────────────
+    def clientes(self):
+        return list(self.projects)
+
+    def proyecto(self, cliente, proyecto):
+        """(tareas, est, cons, pend) de un proyecto, con las horas ya en float."""
+        est, cons, pend = self.proj_tot[(cliente, proyecto)]
+        return list(self.projects[cliente][proyecto].values()), _horas(est), _horas(cons), _horas(pend)
+
+    def cliente(self, cliente):
+        """(est, cons, pend, n_tareas) del cliente."""
+        est, cons, pend, n = self.cli_tot.get(cliente, (0, 0, 0, 0))
+        return _horas(est), _horas(cons), _horas(pend), n
+
+    def clockify_proyecto(self, proyecto):
+        return self.cw_proj.get(proyecto, {"total": 0, "users": {}})
+
+    def clockify_cliente(self, cliente):
+        return self.cw_client.get(cliente, {}).get("total", 0)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+almacen.py – Base SQLite opcional con issues, horas, usuarios y mapeos
+=======================================================================
+process_data.py (--sqlite) y servidor.py ("sqlite_path" en config.json)
+guardan acá lo que procesan; el dashboard se puede rearmar por consulta sin
+volver a parsear ni a descargar nada.
+
+Consultas sueltas desde la terminal:
+    python almacen.py dashboard.db horas [--proyecto X] [--desde AAAA-MM-DD] [--hasta AAAA-MM-DD]
+    python almacen.py dashboard.db sql "SELECT estado, COUNT(*) FROM issues GROUP BY estado"
+"""
+
+import argparse
+import sqlite3
+import threading
+from datetime import date, datetime
+
+from agregador import Agregador, semaforo_fecha
+from mapeos import CW_TO_JIRA, JIRA_TO_CLIENT
+from tareas import Tarea
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    id               TEXT PRIMARY KEY,
+    cliente          TEXT NOT NULL,
+    proyecto         TEXT NOT NULL,
+    resumen          TEXT,
+    estado           TEXT,
+    persona          TEXT,
+    horas_estimadas  REAL,
+    horas_consumidas REAL,
+    horas_pendientes REAL,
+    fecha_fin        TEXT,
+    fecha_fin_real   TEXT,
+    desvio_dias      INTEGER,
+    sem_fecha        TEXT,
+    sem_horas        TEXT,
+    es_finalizado    INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_issues_proyecto ON issues (cliente, proyecto);
+CREATE INDEX IF NOT EXISTS ix_issues_persona  ON issues (persona);
+CREATE INDEX IF NOT EXISTS ix_issues_estado   ON issues (estado);
+CREATE INDEX IF NOT EXISTS ix_issues_fecha    ON issues (fecha_fin);
+
+CREATE TABLE IF NOT EXISTS time_entries (
+    id          TEXT PRIMARY KEY,
+    proyecto_cw TEXT NOT NULL,
+    usuario     TEXT NOT NULL,
+    fecha       TEXT,
+    horas       REAL NOT NULL,
+    cliente     TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_te_proyecto ON time_entries (proyecto_cw, usuario, fecha);
+CREATE INDEX IF NOT EXISTS ix_te_usuario  ON time_entries (usuario, fecha);
+CREATE INDEX IF NOT EXISTS ix_te_fecha    ON time_entries (fecha);
+
+CREATE TABLE IF NOT EXISTS users (
+    nombre TEXT PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS proyectos (
+    proyecto TEXT PRIMARY KEY,
+    cliente  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS proyectos_clockify (
+    proyecto_cw TEXT PRIMARY KEY,
+    proyecto    TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+ISSUE_COLS = ("id", "cliente", "proyecto", "resumen", "estado", "persona",
+              "horas_estimadas", "horas_consumidas", "horas_pendientes",
+              "fecha_fin", "fecha_fin_real", "desvio_dias",
+              "sem_fecha", "sem_horas", "es_finalizado")
+
+
+def entrada(id, proyecto_cw, usuario, fecha, horas, cliente=None):
+    """Fila de time_entries; `cliente` es el que trae Clockify (para proyectos sin mapeo)."""
+    return (id, proyecto_cw, usuario, fecha, horas, cliente)
+
+
+class Almacen:
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db   = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # ── Escritura ───────────────────────────────────────────────────
+    def guardar(self, agg, entradas):
+        """Reemplaza el contenido con las tareas del agregador y las entradas de horas."""
+        issues = [(t.id, cl, prj, t.resumen, t.estado, t.persona,
+                   t.horas_estimadas, t.horas_consumidas, t.horas_pendientes,
+                   t.fecha_fin, t.fecha_fin_real, t.desvio_dias,
+                   t.sem_fecha, t.sem_horas, int(t.es_finalizado))
+                  for cl, prj, t in agg.tasks.values()]
+        entradas = list(entradas)
+        users = {(t.persona,) for _, _, t in agg.tasks.values()} | {(e[2],) for e in entradas}
+
+        with self.lock, self.db:
+            for table in ("issues", "time_entries", "users", "proyectos", "proyectos_clockify"):
+                self.db.execute(f"DELETE FROM {table}")
+            self.db.executemany(
+                f"INSERT INTO issues ({','.join(ISSUE_COLS)}) VALUES ({','.join('?' * len(ISSUE_COLS))})",
+                issues)
+            self.db.executemany("INSERT OR REPLACE INTO time_entries VALUES (?,?,?,?,?,?)", entradas)
+            self.db.executemany("INSERT INTO users VALUES (?)", sorted(users))
+            self.db.executemany("INSERT INTO proyectos VALUES (?,?)", JIRA_TO_CLIENT.items())
+            self.db.executemany("INSERT INTO proyectos_clockify VALUES (?,?)", CW_TO_JIRA.items())
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('actualizado', ?)",
+                            (datetime.now().isoformat(),))
+
+    # ── Lectura ─────────────────────────────────────────────────────
+    def actualizado(self):
+        with self.lock:
+            row = self.db.execute("SELECT valor FROM meta WHERE clave = 'actualizado'").fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def agregador(self, hoy=None):
+        """Arma un Agregador desde la base (sin re-parsear nada).
+
+        Si se pasa `hoy` (date o datetime, según el pipeline) se recalcula el
+        semáforo de fecha, que depende del día en que se mira.
+        """
+        agg = Agregador()
+        with self.lock:
+            issues = self.db.execute(
+                f"SELECT {','.join(ISSUE_COLS)} FROM issues ORDER BY rowid").fetchall()
+            horas  = self.db.execute(
+                "SELECT proyecto_cw, usuario, cliente, SUM(horas) FROM time_entries "
+                "GROUP BY proyecto_cw, usuario, cliente ORDER BY MIN(rowid)").fetchall()
+
+        parse = None
+        if hoy is not None:
+            parse = datetime.fromisoformat if isinstance(hoy, datetime) else date.fromisoformat
+        for row in issues:
+            rec = dict(zip(ISSUE_COLS, row))
+            cl, prj = rec.pop("cliente"), rec.pop("proyecto")
+            rec["es_finalizado"] = bool(rec["es_finalizado"])
+            if parse:
+                ffin  = parse(rec["fecha_fin"])           if rec["fecha_fin"]      else None
+                freal = parse(rec["fecha_fin_real"][:10]) if rec["fecha_fin_real"] else None
+                rec["sem_fecha"] = semaforo_fecha(ffin, freal, rec["es_finalizado"], hoy)
+            agg.upsert(cl, prj, Tarea(**rec))
+        for proyecto_cw, usuario, cliente, total in horas:
+            agg.add_time(proyecto_cw, usuario, total, cliente)
+        return agg
+
+    def horas_por_usuario(self, proyecto=None, desde=None, hasta=None):
+        """[(proyecto Jira, usuario, horas)] en el rango de fechas (inclusive)."""
+        sql  = ("SELECT COALESCE(pc.proyecto, te.proyecto_cw), te.usuario, ROUND(SUM(te.horas), 2) "
+                "FROM time_entries te LEFT JOIN proyectos_clockify pc USING (proyecto_cw) WHERE 1=1")
+        args = []
+        if proyecto:
+            sql += " AND COALESCE(pc.proyecto, te.proyecto_cw) = ?"
+            args.append(proyecto)
+        if desde:
+            sql += " AND te.fecha >= ?"
+            args.append(desde)
+        if hasta:
+            sql += " AND te.fecha <= ?"
+            args.append(hasta)
+        sql += " GROUP BY 1, 2 ORDER BY 1, 3 DESC"
+        with self.lock:
+            return self.db.execute(sql, args).fetchall()
+
+    def consulta(self, sql, args=()):
+        with self.lock:
+            cur = self.db.execute(sql, args)
+            return [d[0] for d in cur.description or ()], cur.fetchall()
+
+
+if __name__ == "__main__":
+    ap  = argparse.ArgumentParser(description="Consultas sobre la base SQLite del dashboard")
+    ap.add_argument("db")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    h   = sub.add_parser("horas", help="horas de Clockify por usuario y proyecto")
+    h.add_argument("--proyecto")
+    h.add_argument("--desde")
+    h.add_argument("--hasta")
+    q   = sub.add_parser("sql", help="consulta SQL libre")
+    q.add_argument("query")
+    args = ap.parse_args()
+
+    alm = Almacen(args.db)
+    if args.cmd == "horas":
+        for proyecto, usuario, horas in alm.horas_por_usuario(args.proyecto, args.desde, args.hasta):
+            print(f"{proyecto:<35} {usuario:<30} {horas:>8}")
+    else:
+        cols, rows = alm.consulta(args.query)
+        print(" | ".join(cols))
+        for r in rows:
+            print(" | ".join(str(v) for v in r))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+bench_parseo.py – Microbenchmarks de parseo.py contra las funciones anteriores
+==============================================================================
+Compara parse_jira_date / seconds_to_hours (antes en process_data.py) y
+parse_iso_duration (antes en servidor.py) con las versiones cacheadas de
+parseo.py, y parse_iso_durations (en lote, la que usa process_clockify),
+sobre valores con la repetición típica de los exports reales.
+Verifica además que ambos den exactamente el mismo resultado.
+
+Ejecutá (desde la raíz del repo):
+    python benchmarks/bench_parseo.py [n_valores]
+"""
+
+import os
+import random
+import re
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import parseo  # noqa: E402
+
+# ── Implementaciones anteriores (copiadas tal cual, como referencia) ────────
+
+MESES_ES = parseo.MESES_ES
+
+def old_parse_jira_date(date_str):
+    if not date_str or not date_str.strip():
+        return None
+    try:
+        parts = date_str.strip().split(' ')
+        date_part = parts[0]
+        day, mon, year = date_part.split('/')
+        month = MESES_ES.get(mon.lower().replace('.', ''), 0)
+        if not month:
+            return None
+        full_year = 2000 + int(year) if int(year) < 100 else int(year)
+        return datetime(full_year, month, int(day))
+    except Exception:
+        return None
+
+def old_seconds_to_hours(s):
+    if not s or not s.strip():
+        return None
+    try:
+        return round(int(s) / 3600, 2)
+    except Exception:
+        return None
+
+def old_parse_iso_duration(s):
+    if not s or not s.startswith("PT"):
+        return 0.0
+    h   = int(re.search(r"(\d+)H", s).group(1)) if "H" in s else 0
+    m   = int(re.search(r"(\d+)M", s).group(1)) if "M" in s else 0
+    sec = int(re.search(r"(\d+)S", s).group(1)) if "S" in s else 0
+    return h + m / 60 + sec / 3600
+
+# ── Datos ───────────────────────────────────────────────────────────────────
+
+def sample(n, seed=7):
+    rnd   = random.Random(seed)
+    meses = list(MESES_ES)
+    dates = [f"{rnd.randint(1, 28)}/{rnd.choice(meses)}/26 {rnd.randint(1, 12)}:{rnd.randint(0, 59):02d} "
+             f"{rnd.choice(['AM', 'PM'])}" for _ in range(n)] + ["", "  ", "basura", "1/xyz/26"]
+    secs  = [str(900 * rnd.randint(0, 64)) for _ in range(n)] + ["", "abc"]
+    durs  = [f"PT{rnd.randint(0, 9)}H{rnd.choice([0, 15, 30, 45])}M" if rnd.random() < 0.8
+             else f"PT{rnd.randint(1, 59)}M{rnd.randint(0, 59)}S" for _ in range(n)] + ["PT0S", "PT1.5S", "", "P1D"]
+    return dates, secs, durs
+
+def bench(label, old, new, values, repeat=5, lote=False):
+    """`lote`: new recibe la lista entera en vez de un valor."""
+    convertir = new if lote else (lambda vs: [new(v) for v in vs])
+    assert [old(v) for v in values] == convertir(values), label
+    t_old = min(timeit.repeat(lambda: [old(v) for v in values], number=1, repeat=repeat))
+    t_new = min(timeit.repeat(lambda: convertir(values), number=1, repeat=repeat))
+    print(f"{label:<22} antes {t_old * 1e3:8.1f} ms | ahora {t_new * 1e3:8.1f} ms | x{t_old / t_new:5.1f}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    dates, secs, durs = sample(n)
+    print(f"{n:,} valores por función\n")
+    bench("parse_jira_date",    old_parse_jira_date,    parseo.parse_jira_date,    dates)
+    bench("seconds_to_hours",   old_seconds_to_hours,   parseo.seconds_to_hours,   secs)
+    bench("parse_iso_duration", old_parse_iso_duration, parseo.parse_iso_duration, durs)
+    bench("parse_iso_durations", old_parse_iso_duration, parseo.parse_iso_durations, durs, lote=True)
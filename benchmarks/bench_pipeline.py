@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+bench_pipeline.py – Tiempo y memoria de todo el pipeline con datos sintéticos
+==============================================================================
+Genera exports de Jira y Clockify (CSV con el layout real de columnas y fechas
+en castellano) y sirve las páginas de la búsqueda de Jira y del reporte
+detallado de Clockify desde un servidor HTTP local en otro proceso. Mide, por
+etapa, el mejor tiempo de varias corridas y el pico de memoria (tracemalloc,
+en una corrida aparte):
+
+  CSV  process_clockify · process_jira · build_dashboard        (process_data.py)
+  API  fetch_jira · process_jira · fetch_clockify · build_data · fetch_all   (servidor.py)
+
+Ejecutá (desde la raíz del repo):
+    python benchmarks/bench_pipeline.py                          # 1k, 10k, 100k registros
+    python benchmarks/bench_pipeline.py 1000 1000000             # tamaños a elección
+    python benchmarks/bench_pipeline.py --guardar base.json      # guardar como base
+    python benchmarks/bench_pipeline.py --comparar base.json     # marcar regresiones
+
+Con --comparar sale con código 1 si alguna etapa tarda (o pide memoria) más
+que la base por encima de --tolerancia. El pico no incluye a los procesos
+hijos (parseo en paralelo de CSVs grandes de Jira).
+"""
+
+import argparse
+import contextlib
+import csv
+import gc
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import process_data  # noqa: E402
+import servidor  # noqa: E402
+from agregador import Agregador  # noqa: E402
+from mapeos import CLIENT_JIRA_MAP, CW_TO_JIRA, JIRA_TO_CLIENT  # noqa: E402
+from parseo import MESES_ES  # noqa: E402
+
+SIZES          = [1_000, 10_000, 100_000]
+JIRA_PAGE_MAX  = 100      # Jira Cloud no devuelve más de 100 issues por página
+CLOCKIFY_PAGE  = 1000     # pageSize que pide servidor.py
+MIN_DELTA      = {"seg": 0.005, "pico_mib": 0.5}   # diferencias menores son ruido
+
+PROYECTOS    = [p for ps in CLIENT_JIRA_MAP.values() for p in ps] + ["Proyecto sin cliente"]
+CW_PROYECTOS = list(CW_TO_JIRA) + ["Interno", "Capacitación"]
+ESTADOS      = ["Tareas por hacer", "En curso", "Finalizada", "En revisión", "Bloqueada", "Entrega"]
+PERSONAS     = [f"Persona {i}" for i in range(40)]
+USUARIOS     = [f"usuario.{i}" for i in range(40)]
+MESES        = list(MESES_ES)
+
+# ── Datos sintéticos ────────────────────────────────────────────────────────
+
+def _jira_fecha(rnd, hora=True):
+    """Fecha como la exporta Jira en castellano: 12/feb/26 2:44 PM."""
+    d = f"{rnd.randint(1, 28):02d}/{rnd.choice(MESES)}/{rnd.choice([25, 26])}"
+    if not hora:
+        return d + " 12:00 AM"
+    return f"{d} {rnd.randint(1, 12)}:{rnd.randint(0, 59):02d} {rnd.choice(['AM', 'PM'])}"
+
+def _jira_header():
+    """Encabezado del export real si está en el repo; si no, solo las columnas que se usan."""
+    path = os.path.join(ROOT, "Jira-2.csv")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            return next(csv.reader(f))
+    return list(process_data.JIRA_COLUMNS)
+
+def jira_csv(path, n, seed=1):
+    rnd    = random.Random(seed)
+    header = _jira_header()
+    col    = {c: header.index(c) for c in process_data.JIRA_COLUMNS}
+    desc   = header.index("Descripción") if "Descripción" in header else None
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        for i in range(n):
+            row = [""] * len(header)
+            est = rnd.choice(["", str(3600 * rnd.randint(1, 40))])
+            row[col["Resumen"]]                   = f"Tarea sintética número {i}, con \"comillas\""
+            row[col["Clave de incidencia"]]       = f"BENCH-{i}"
+            row[col["Estado"]]                    = rnd.choice(ESTADOS)
+            row[col["Nombre del proyecto"]]       = rnd.choice(PROYECTOS)
+            row[col["Persona asignada"]]          = rnd.choice(PERSONAS + [""])
+            row[col["Resuelta"]]                  = rnd.choice(["", _jira_fecha(rnd)])
+            row[col["Fecha de vencimiento"]]      = rnd.choice(["", _jira_fecha(rnd, hora=False)])
+            row[col["Estimación original"]]       = est
+            row[col["Trabajo restante estimado"]] = est and str(rnd.randint(0, int(est)))
+            row[col["Tiempo Trabajado"]]          = rnd.choice(["", str(1800 * rnd.randint(0, 60))])
+            if desc is not None:
+                row[desc] = "Descripción en\nvarias líneas"
+            w.writerow(row)
+
+def clockify_csv(path, n, seed=2):
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f, quoting=csv.QUOTE_ALL)
+        w.writerow(["Project", "Client", "Description", "Task", "Kiosk", "User", "Group", "Email",
+                    "Tags", "Billable", "Start Date", "Start Time", "End Date", "End Time",
+                    "Duration (h)", "Duration (decimal)", "Billable Rate (USD)",
+                    "Billable Amount (USD)", "Date of creation"])
+        for i in range(n):
+            proj  = rnd.choice(CW_PROYECTOS)
+            user  = rnd.choice(USUARIOS)
+            mins  = 15 * rnd.randint(1, 32)
+            fecha = f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2026"
+            w.writerow([proj, JIRA_TO_CLIENT.get(CW_TO_JIRA.get(proj), ""), f"Entrada {i}",
+                        "Desarrollo", "", user, "", f"{user}@empresa.com", "", "Yes",
+                        fecha, "9:00", fecha, "", f"{mins // 60}:{mins % 60:02d}",
+                        f"{mins / 60:.2f}", "0.00", "0.00", fecha])
+
+def api_issue(i):
+    """Issue i de la búsqueda de Jira (determinística: misma i, misma issue)."""
+    rnd = random.Random(i)
+    est = rnd.choice([None, 3600 * rnd.randint(1, 40)])
+    due = rnd.choice([None, f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"])
+    res = rnd.choice([None, f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T10:00:00.000-0300"])
+    return {"key": f"BENCH-{i}", "fields": {
+        "summary":              f"Tarea sintética número {i}",
+        "status":               {"name": rnd.choice(ESTADOS)},
+        "assignee":             rnd.choice([None, {"displayName": rnd.choice(PERSONAS)}]),
+        "duedate":              due,
+        "resolutiondate":       res,
+        "timeoriginalestimate": est,
+        "timeestimate":         est and rnd.randint(0, est),
+        "timespent":            rnd.choice([None, 1800 * rnd.randint(0, 60)]),
+        "project":              {"name": rnd.choice(PROYECTOS)},
+    }}
+
+def api_entry(i):
+    """Entrada i del reporte detallado de Clockify."""
+    rnd  = random.Random(-1 - i)
+    proj = rnd.choice(CW_PROYECTOS)
+    mins = 15 * rnd.randint(1, 32)
+    return {
+        "_id":          f"{i:024x}",
+        "projectName":  proj,
+        "clientName":   JIRA_TO_CLIENT.get(CW_TO_JIRA.get(proj), ""),
+        "userName":     rnd.choice(USUARIOS),
+        "description":  f"Entrada {i}",
+        "timeInterval": {"start":    f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T09:00:00Z",
+                         "duration": f"PT{mins // 60}H{mins % 60}M" if mins % 60 else f"PT{mins // 60}H"},
+    }
+
+# ── Servidor local (Jira + Clockify) ────────────────────────────────────────
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    n     = 0
+    pages = {}    # (ruta, inicio, tamaño) → cuerpo ya serializado
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", len(body))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @classmethod
+    def jira_page(cls, start, size):
+        key = ("jira", start, size)
+        if key not in cls.pages:
+            issues = [api_issue(i) for i in range(start, min(start + size, cls.n))]
+            cls.pages[key] = json.dumps({"startAt": start, "maxResults": size,
+                                         "total": cls.n, "issues": issues}).encode()
+        return cls.pages[key]
+
+    @classmethod
+    def clockify_page(cls, page, size):
+        key = ("clockify", page, size)
+        if key not in cls.pages:
+            entries = [api_entry(i) for i in range((page - 1) * size, min(page * size, cls.n))]
+            cls.pages[key] = json.dumps({"totals": [{"entriesCount": cls.n}],
+                                         "timeentries": entries}).encode()
+        return cls.pages[key]
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        q   = parse_qs(url.query)
+        if url.path == "/rest/api/3/search":
+            size = min(int(q.get("maxResults", [50])[0]), JIRA_PAGE_MAX)
+            self._send(self.jira_page(int(q.get("startAt", [0])[0]), size))
+        elif url.path == "/workspaces":
+            self._send(b'[{"id": "bench", "name": "Bench"}]')
+        else:
+            self._send(b"{}", 404)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        flt  = body.get("detailedFilter", {})
+        self._send(self.clockify_page(flt.get("page", 1), flt.get("pageSize", 50)))
+
+
+def serve(n, conn):
+    """Proceso hijo: arma de antemano las páginas que va a pedir servidor.py y atiende."""
+    MockHandler.n = n
+    for start in range(0, n, JIRA_PAGE_MAX):
+        MockHandler.jira_page(start, JIRA_PAGE_MAX)
+    for page in range(1, -(-n // CLOCKIFY_PAGE) + 1):
+        MockHandler.clockify_page(page, CLOCKIFY_PAGE)
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), MockHandler)
+    conn.send(srv.server_address[1])
+    srv.serve_forever()
+
+# ── Medición ────────────────────────────────────────────────────────────────
+
+def callado(fn):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn()
+
+def medir(nombre, fn, res, memoria=True, repeat=3):
+    """Mejor tiempo de `repeat` corridas de fn() y, si `memoria`, el pico de otra con tracemalloc."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        seg = float("inf")
+        for _ in range(repeat):
+            gc.collect()
+            t0  = time.perf_counter()
+            fn()
+            seg = min(seg, time.perf_counter() - t0)
+        pico = None
+        if memoria:
+            gc.collect()
+            tracemalloc.start()
+            fn()
+            pico = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+    res[nombre] = {"seg": round(seg, 4), "pico_mib": pico and round(pico, 2)}
+    print(f"  {nombre:<22} {seg * 1e3:10.1f} ms" + (f" | pico {pico:8.1f} MiB" if memoria else ""))
+
+
+def run(n, memoria=True, repeat=3):
+    res = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        jira_path, cw_path = os.path.join(tmp, "jira.csv"), os.path.join(tmp, "clockify.csv")
+        jira_csv(jira_path, n)
+        clockify_csv(cw_path, n)
+        mib = lambda p: os.path.getsize(p) / 2**20
+        print(f"\n{n:,} registros (Jira CSV {mib(jira_path):.1f} MiB, Clockify CSV {mib(cw_path):.1f} MiB)")
+
+        medir("csv.process_clockify", lambda: process_data.process_clockify(cw_path, Agregador()), res, memoria, repeat)
+        medir("csv.process_jira",     lambda: process_data.process_jira(jira_path, Agregador()), res, memoria, repeat)
+        agg = callado(lambda: process_data.process_jira(jira_path, process_data.process_clockify(cw_path, Agregador())))
+        medir("csv.build_dashboard",  lambda: process_data.build_dashboard(agg), res, memoria, repeat)
+
+        parent, child = multiprocessing.Pipe()
+        mock = multiprocessing.Process(target=serve, args=(n, child), daemon=True)
+        mock.start()
+        base = f"http://127.0.0.1:{parent.recv()}"
+        cfg  = {
+            "jira_domain": base, "jira_email": "bench", "jira_token": "bench",
+            "jira_incremental": False,
+            "clockify_key": "bench", "clockify_workspace": "bench", "clockify_incremental": False,
+            "clockify_api_url": base, "clockify_reports_url": base,
+            "clockify_date_from": "2026-01-01T00:00:00.000Z",
+        }
+        try:
+            cwd = os.getcwd()
+            os.chdir(tmp)     # por si algo del servidor escribe en el directorio actual
+            medir("api.fetch_jira",     lambda: servidor.fetch_jira(cfg), res, memoria, repeat)
+            issues = callado(lambda: servidor.fetch_jira(cfg))
+            medir("api.process_jira",   lambda: servidor.process_jira(issues, Agregador()), res, memoria, repeat)
+            medir("api.fetch_clockify", lambda: servidor.fetch_clockify(cfg, Agregador()), res, memoria, repeat)
+            agg = callado(lambda: servidor.fetch_clockify(cfg, servidor.process_jira(issues, Agregador())))
+            del issues
+            medir("api.build_data",     lambda: servidor.build_data(agg), res, memoria, repeat)
+            del agg
+            medir("api.fetch_all",      lambda: servidor.fetch_all(cfg), res, memoria, repeat)
+        finally:
+            os.chdir(cwd)
+            mock.terminate()
+    return res
+
+# ── Base de comparación ─────────────────────────────────────────────────────
+
+def comparar(resultados, base, tolerancia):
+    """Imprime las etapas que empeoraron respecto de la base; devuelve cuántas."""
+    regresiones = 0
+    print(f"\nComparación con la base del {base.get('fecha', '?')} (tolerancia {tolerancia:.0%})")
+    for n, etapas in resultados.items():
+        for etapa, r in etapas.items():
+            b = base.get("resultados", {}).get(n, {}).get(etapa)
+            if not b:
+                continue
+            for campo in ("seg", "pico_mib"):
+                antes, ahora = b.get(campo), r.get(campo)
+                if not antes or ahora is None:
+                    continue
+                if ahora > antes * (1 + tolerancia) and ahora - antes > MIN_DELTA[campo]:
+                    regresiones += 1
+                    print(f"  ✗ {int(n):>9,} {etapa:<22} {campo:<8} {antes:>10} → {ahora:<10} "
+                          f"(+{ahora / antes - 1:.0%})")
+    print("  ✓ sin regresiones" if not regresiones else f"  {regresiones} regresiones")
+    return regresiones
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark del pipeline con datos sintéticos")
+    ap.add_argument("sizes", nargs="*", type=int, help=f"registros por fuente (default {SIZES})")
+    ap.add_argument("--repeticiones", type=int, default=3, help="corridas por etapa (vale la mejor)")
+    ap.add_argument("--sin-memoria", action="store_true", help="no medir el pico de memoria")
+    ap.add_argument("--guardar",  metavar="JSON", help="guardar los resultados como base")
+    ap.add_argument("--comparar", metavar="JSON", help="comparar contra una base guardada")
+    ap.add_argument("--tolerancia", type=float, default=0.2, help="margen antes de marcar regresión")
+    args = ap.parse_args()
+
+    resultados = {str(n): run(n, not args.sin_memoria, args.repeticiones) for n in args.sizes or SIZES}
+
+    if args.guardar:
+        with open(args.guardar, "w") as f:
+            json.dump({"fecha": datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "maquina": platform.node(),
+                       "resultados": resultados}, f, indent=2)
+        print(f"\nBase guardada en {args.guardar}")
+    if args.comparar:
+        with open(args.comparar) as f:
+            base = json.load(f)
+        sys.exit(1 if comparar(resultados, base, args.tolerancia) else 0)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+bench_tareas.py – Memoria y tiempo de process_jira + build_data
+================================================================
+Genera N issues sintéticas con la forma de la API de Jira y mide:
+  · tiempo de process_jira y de build_data
+  · pico de memoria (tracemalloc) del armado
+  · memoria retenida por las tareas como Tarea (__slots__) vs. como dict
+
+Ejecutá (desde la raíz del repo):
+    python benchmarks/bench_tareas.py              # 50k, 100k, 200k
+    python benchmarks/bench_tareas.py 10000 20000
+"""
+
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import servidor  # noqa: E402
+from agregador import Agregador  # noqa: E402
+
+ESTADOS  = ["Tareas por hacer", "En curso", "Finalizada", "En revisión", "Bloqueada"]
+PERSONAS = [f"Persona {i}" for i in range(40)]
+
+
+def synthetic_issues(n, seed=1):
+    rnd      = random.Random(seed)
+    projects = [p for ps in servidor.CLIENT_JIRA_MAP.values() for p in ps]
+    issues   = []
+    for i in range(n):
+        est  = rnd.choice([None, 3600 * rnd.randint(1, 40)])
+        due  = rnd.choice([None, f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"])
+        res  = rnd.choice([None, f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}T10:00:00.000-0300"])
+        issues.append({"key": f"BENCH-{i}", "fields": {
+            "summary":              f"Tarea sintética número {i}",
+            "status":               {"name": rnd.choice(ESTADOS)},
+            "assignee":             rnd.choice([None, {"displayName": rnd.choice(PERSONAS)}]),
+            "duedate":              due,
+            "resolutiondate":       res,
+            "timeoriginalestimate": est,
+            "timeestimate":         est and rnd.randint(0, est),
+            "timespent":            rnd.choice([None, 1800 * rnd.randint(0, 60)]),
+            "project":              {"name": rnd.choice(projects)},
+        }})
+    # Ida y vuelta por JSON: como llega de la API, sin strings compartidos entre issues
+    return json.loads(json.dumps(issues))
+
+
+def retained(build):
+    """Bytes que quedan vivos después de build() (medido con tracemalloc)."""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def run(n):
+    issues = synthetic_issues(n)
+
+    t0 = time.perf_counter()
+    agg = servidor.process_jira(issues, Agregador())
+    t1 = time.perf_counter()
+    servidor.build_data(agg)
+    t2 = time.perf_counter()
+
+    tracemalloc.start()
+    servidor.build_data(servidor.process_jira(issues, Agregador()))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    flat = lambda a: [t for _, _, t in a.tasks.values()]
+    _, mem_slots = retained(lambda: flat(servidor.process_jira(issues, Agregador())))
+    tareas = flat(agg)
+    _, mem_dict = retained(lambda: [t.as_api_dict() for t in tareas])
+
+    print(f"{n:>8,} issues | process_jira {t1 - t0:6.2f}s | build_data {t2 - t1:6.2f}s | "
+          f"pico {peak / 2**20:7.1f} MiB | tareas: slots {mem_slots / 2**20:6.1f} MiB "
+          f"vs dict {mem_dict / 2**20:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [50_000, 100_000, 200_000]
+    for n in sizes:
+        run(n)
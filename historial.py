@@ -0,0 +1,101 @@
+"""
+historial.py – Evolución de KPIs y estados entre refrescos
+===========================================================
+Cada refresco que cambió algo agrega una línea a un archivo JSONL. La
+primera guarda el estado completo y las demás solo lo que cambió respecto
+de la anterior (valor nuevo, o null si la clave desapareció); los refrescos
+sin cambios no se escriben, así un año de refrescos cada pocos minutos
+ocupa poco.
+
+Al cargar se arma, por clave, la lista de cambios; una serie de un cliente
+o proyecto se reconstruye desde esas listas sin re-aplicar los snapshots.
+"""
+
+import json
+import os
+import threading
+
+SEP = "\t"
+
+
+def _flatten(clients):
+    """clients (formato de build_data/build_dashboard) → {clave: valor}.
+
+    c<TAB>cliente<TAB>kpi · p<TAB>cliente<TAB>proyecto<TAB>campo · t<TAB>id → estado
+    """
+    flat = {}
+    for c in clients:
+        for k, v in c["kpis"].items():
+            flat[SEP.join(("c", c["nombre"], k))] = v
+        for p in c["proyectos"]:
+            for k, v in p.items():
+                if isinstance(v, (int, float)) and not isinstance(v, bool):
+                    flat[SEP.join(("p", c["nombre"], p["nombre"], k))] = v
+            for t in p["tareas"]:
+                flat[SEP.join(("t", t.id))] = t.estado
+    return flat
+
+
+class Historial:
+
+    def __init__(self, path):
+        self.path    = path
+        self.lock    = threading.Lock()
+        self.ts      = []     # timestamp de cada snapshot
+        self.changes = {}     # clave → [(n° de snapshot, valor)]
+        self.state   = {}     # estado completo del último snapshot
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        rec = json.loads(line)
+                        self._apply(rec["ts"], rec.get("full") or rec.get("delta", {}))
+
+    def _apply(self, ts, delta):
+        i = len(self.ts)
+        self.ts.append(ts)
+        for k, v in delta.items():
+            self.changes.setdefault(k, []).append((i, v))
+            if v is None:
+                self.state.pop(k, None)
+            else:
+                self.state[k] = v
+
+    def append(self, clients, ts):
+        """Registra un snapshot; devuelve cuántas claves cambiaron (0 = no se escribió nada)."""
+        cur = _flatten(clients)
+        with self.lock:
+            if not self.ts:
+                rec = {"ts": ts, "full": cur}
+                delta = cur
+            else:
+                delta = {k: v for k, v in cur.items() if self.state.get(k) != v}
+                delta.update({k: None for k in self.state if k not in cur})
+                if not delta:
+                    return 0
+                rec = {"ts": ts, "delta": delta}
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._apply(ts, delta)
+        return len(delta)
+
+    def _series(self, key):
+        """Valores de `key` en cada snapshot (None donde no existía)."""
+        out, val, changes, j = [], None, self.changes.get(key, ()), 0
+        for i in range(len(self.ts)):
+            while j < len(changes) and changes[j][0] == i:
+                val = changes[j][1]
+                j += 1
+            out.append(val)
+        return out
+
+    def series(self, cliente=None, proyecto=None, tarea=None):
+        """{"ts": [...], "valores": {campo: [...]}} de un cliente, proyecto o tarea."""
+        with self.lock:
+            if tarea:
+                key     = SEP.join(("t", tarea))
+                valores = {"estado": self._series(key)} if key in self.changes else {}
+            else:
+                prefix  = SEP.join(("p", cliente, proyecto) if proyecto else ("c", cliente)) + SEP
+                valores = {k[len(prefix):]: self._series(k) for k in self.changes if k.startswith(prefix)}
+            return {"ts": list(self.ts), "valores": valores}
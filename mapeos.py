@@ -0,0 +1,133 @@
+"""
+mapeos.py – Clientes, proyectos y estados compartidos
+======================================================
+Única definición de los mapeos que usan process_data.py, servidor.py e
+index.html (que los pide a /api/mapeos).
+
+Los valores de acá son los de fábrica; si existe mapeos.json (ver
+mapeos.json.example) sus claves los reemplazan. cargar() actualiza los
+dicts en el lugar, así quien hizo `from mapeos import CW_TO_JIRA` ve los
+valores nuevos; el servidor lo llama cuando el archivo cambia.
+"""
+
+import json
+import os
+import threading
+
+MAPEOS_FILE = "mapeos.json"
+
+CLIENT_JIRA_MAP = {
+    "Transener":     ["TRANSENER TESLA", "TRANSENER Costeo Emplazamiento", "TRANSENER Mantenimiento"],
+    "SACDE":         ["SACDE - Francos", "SACDE - Equipos", "SACDE - Partes Diarios",
+                      "SACDE APP MATERIALES", "SACDE Mantenimiento", "SACDE PORTAL"],
+    "Bayer":         ["Bayer"],
+    "Pampa Energia": ["PAMPA Almacenes Mejoras"],
+}
+JIRA_TO_CLIENT = {p: cl for cl, ps in CLIENT_JIRA_MAP.items() for p in ps}
+
+# Proyecto de Clockify → proyecto de Jira
+CW_TO_JIRA = {
+    "Tesla":                               "TRANSENER TESLA",
+    "Costeo de Emplazamiento":             "TRANSENER Costeo Emplazamiento",
+    "Migración S4":                        "TRANSENER Mantenimiento",
+    "Interface de Francos Compensatorios": "TRANSENER Mantenimiento",
+    "Trello":                              "TRANSENER Mantenimiento",
+    "Premios":                             "TRANSENER Mantenimiento",
+    "Paquete 4 ''Francos APK''":           "SACDE - Francos",
+    "Portal de Proveedores FASE 1":        "SACDE PORTAL",
+    "Portal de Proveedores FASE 2":        "SACDE PORTAL",
+    "Auditoria Seguridad":                 "SACDE Mantenimiento",
+    "Soporte":                             "SACDE Mantenimiento",
+    "Consultoria FICO":                    "SACDE Mantenimiento",
+    "App Facilites":                       "Bayer",
+    "Mejoras Solped":                      "Bayer",
+    "Mejoras App Almacenes- Fase 2":       "PAMPA Almacenes Mejoras",
+}
+
+CLIENT_COLORS = {
+    "Transener":    "#6366f1",
+    "SACDE":        "#f59e0b",
+    "Bayer":        "#3b82f6",
+    "Pampa Energia":"#10b981",
+}
+DEFAULT_COLOR = "#667eea"
+
+ESTADOS_DONE = {
+    "finalizada", "cerrado", "resuelto", "done", "closed", "resolved",
+    "completado", "completada", "terminado", "terminada", "entrega",
+}
+
+DEFAULTS = {
+    "client_jira_map": {k: list(v) for k, v in CLIENT_JIRA_MAP.items()},
+    "cw_to_jira":      dict(CW_TO_JIRA),
+    "client_colors":   dict(CLIENT_COLORS),
+    "estados_done":    sorted(ESTADOS_DONE),
+}
+
+# Se toma mientras se clasifica/agrega con los mapeos, y para cambiarlos
+LOCK = threading.RLock()
+GENERACION = 0   # sube en cada cargar(): lo agregado con otra generación hay que rearmarlo
+
+
+def actuales():
+    """Los mapeos vigentes, en el formato de mapeos.json."""
+    with LOCK:
+        return {
+            "client_jira_map": {k: list(v) for k, v in CLIENT_JIRA_MAP.items()},
+            "cw_to_jira":      dict(CW_TO_JIRA),
+            "client_colors":   dict(CLIENT_COLORS),
+            "estados_done":    sorted(ESTADOS_DONE),
+        }
+
+def _es_str(v):
+    return isinstance(v, str)
+
+def _validar(m, path):
+    """Mapeos ya leídos → (client_jira_map, jira_to_client, cw_to_jira, colores, estados)
+    nuevos; ValueError ante cualquier valor que no tenga la forma esperada."""
+    if not isinstance(m, dict):
+        raise ValueError(f"{path}: se esperaba un objeto JSON (ver mapeos.json.example)")
+    m = dict(DEFAULTS, **m)
+    cjm, cw, colors, done = (m["client_jira_map"], m["cw_to_jira"], m["client_colors"],
+                             m["estados_done"])
+    if not (isinstance(cjm, dict)
+            and all(isinstance(v, list) and all(map(_es_str, v)) for v in cjm.values())):
+        raise ValueError(f'{path}: "client_jira_map" debe ser {{cliente: [proyectos de Jira]}}')
+    for nombre, d in (("cw_to_jira", cw), ("client_colors", colors)):
+        if not (isinstance(d, dict) and all(map(_es_str, d.values()))):
+            raise ValueError(f'{path}: "{nombre}" debe ser un objeto de textos')
+    if not (isinstance(done, list) and all(map(_es_str, done))):
+        raise ValueError(f'{path}: "estados_done" debe ser una lista de textos')
+    return (dict(cjm), {p: cl for cl, ps in cjm.items() for p in ps}, dict(cw), dict(colors),
+            {e.lower() for e in done})
+
+def cargar(path=MAPEOS_FILE):
+    """Aplica `path` sobre los valores de fábrica (sin archivo quedan los de fábrica).
+
+    Todo se valida y se arma antes de tocar los dicts: si el archivo no es válido
+    se lanza ValueError y los mapeos vigentes no cambian.
+    """
+    m = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            try:
+                m = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}: {e}") from e
+    cjm, j2c, cw, colors, done = _validar(m, path)
+
+    global GENERACION
+    with LOCK:
+        GENERACION += 1
+        CLIENT_JIRA_MAP.clear(); CLIENT_JIRA_MAP.update(cjm)
+        JIRA_TO_CLIENT.clear();  JIRA_TO_CLIENT.update(j2c)
+        CW_TO_JIRA.clear();      CW_TO_JIRA.update(cw)
+        CLIENT_COLORS.clear();   CLIENT_COLORS.update(colors)
+        ESTADOS_DONE.clear();    ESTADOS_DONE.update(done)
+
+
+# Un mapeos.json roto no impide arrancar: se avisa y quedan los de fábrica
+try:
+    cargar()
+except (OSError, ValueError) as e:
+    print(f"⚠️  No se pudo cargar {MAPEOS_FILE}: {e}; se usan los mapeos de fábrica")
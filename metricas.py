@@ -0,0 +1,130 @@
+"""
+metricas.py – Contadores, gauges e histogramas en memoria para /api/metrics
+============================================================================
+Registrar un evento es sumar en un dict bajo un lock; el texto Prometheus o
+el JSON se arman recién cuando alguien consulta /api/metrics.
+
+    METRICS.inc("source_pages_total", fuente="jira")
+    with METRICS.etapa("process_jira"):
+        ...
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HELP = {
+    "refresh_total":               ("counter",   "Refrescos del snapshot, por resultado"),
+    "refresh_stage_seconds":       ("histogram", "Duración de cada etapa del refresco"),
+    "refresh_stage_last_seconds":  ("gauge",     "Duración de la última corrida de cada etapa"),
+    "source_pages_total":          ("counter",   "Páginas pedidas a Jira/Clockify"),
+    "source_records_total":        ("counter",   "Issues/entradas recibidas de Jira/Clockify"),
+    "source_failures_total":       ("counter",   "Sitios/workspaces que fallaron o no llegaron a tiempo"),
+    "http_client_requests_total":  ("counter",   "Requests salientes, por host y status"),
+    "http_client_bytes_total":     ("counter",   "Bytes recibidos de las APIs, por host"),
+    "http_client_seconds":         ("histogram", "Latencia de los requests salientes"),
+    "http_requests_total":         ("counter",   "Requests atendidos, por endpoint y status"),
+    "http_request_seconds":        ("histogram", "Latencia de los requests atendidos, por endpoint"),
+    "http_response_bytes_total":   ("counter",   "Bytes enviados (Content-Length), por endpoint"),
+    "json_encode_seconds":         ("histogram", "Serialización JSON de las respuestas, por endpoint"),
+    "snapshot_age_seconds":        ("gauge",     "Antigüedad del snapshot publicado"),
+    "snapshot_tasks":              ("gauge",     "Tareas en el snapshot publicado"),
+    "aggregate_changes":           ("gauge",     "Issues/entradas que cambiaron en el último armado, por fuente"),
+    "refresh_coalesced_total":     ("counter",   "Pedidos de refresco que se sumaron a uno en curso"),
+    "sse_connections":             ("gauge",     "Conexiones abiertas a /api/stream"),
+}
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+def _fmt_labels(key, extra=()):
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+
+class Metricas:
+
+    def __init__(self):
+        self.lock   = threading.Lock()
+        self.values = {}   # nombre → {labels → valor}                 (counters y gauges)
+        self.hists  = {}   # nombre → {labels → [cuentas por bucket..., +Inf, suma]}
+
+    def inc(self, name, value=1, **labels):
+        key = _labels(labels)
+        with self.lock:
+            d = self.values.setdefault(name, {})
+            d[key] = d.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = _labels(labels)
+        with self.lock:
+            h = self.hists.setdefault(name, {}).get(key)
+            if h is None:
+                h = self.hists[name][key] = [0] * (len(BUCKETS) + 2)
+            for i, b in enumerate(BUCKETS):
+                if value <= b:
+                    h[i] += 1
+                    break
+            else:
+                h[len(BUCKETS)] += 1
+            h[-1] += value
+
+    @contextmanager
+    def etapa(self, nombre, **labels):
+        """Mide un bloque como etapa del refresco (histograma + última duración)."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            self.observe("refresh_stage_seconds", dt, etapa=nombre, **labels)
+            self.set("refresh_stage_last_seconds", round(dt, 6), etapa=nombre, **labels)
+
+    # ── Exportación ─────────────────────────────────────────────────
+    def _copy(self):
+        with self.lock:
+            return ({n: dict(d) for n, d in self.values.items()},
+                    {n: {k: list(h) for k, h in d.items()} for n, d in self.hists.items()})
+
+    def prometheus(self, prefix="dashboard_"):
+        values, hists = self._copy()
+        out = []
+        for name in sorted(set(values) | set(hists)):
+            kind, help_ = HELP.get(name, ("histogram" if name in hists else "gauge", ""))
+            out.append(f"# HELP {prefix}{name} {help_}")
+            out.append(f"# TYPE {prefix}{name} {kind}")
+            for key, v in sorted(values.get(name, {}).items()):
+                out.append(f"{prefix}{name}{_fmt_labels(key)} {v}")
+            for key, h in sorted(hists.get(name, {}).items()):
+                acc = 0
+                for b, c in zip(BUCKETS + ("+Inf",), h):
+                    acc += c
+                    out.append(f"{prefix}{name}_bucket{_fmt_labels(key, [('le', b)])} {acc}")
+                out.append(f"{prefix}{name}_sum{_fmt_labels(key)} {round(h[-1], 6)}")
+                out.append(f"{prefix}{name}_count{_fmt_labels(key)} {acc}")
+        return "\n".join(out) + "\n"
+
+    def as_dict(self):
+        """{nombre: [{"labels", "value"}]}; los histogramas traen count, sum y la
+        cuenta de cada bucket (no acumulada, a diferencia del formato Prometheus)."""
+        values, hists = self._copy()
+        out = {name: [{"labels": dict(k), "value": v} for k, v in sorted(d.items())]
+               for name, d in values.items()}
+        for name, d in hists.items():
+            out[name] = [{"labels": dict(k), "count": sum(h[:-1]), "sum": round(h[-1], 6),
+                          "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], h[:-1]))}
+                         for k, h in sorted(d.items())]
+        return out
+
+
+METRICS = Metricas()
@@ -0,0 +1,81 @@
+"""
+parseo.py – Conversión de fechas y duraciones compartida
+=========================================================
+Usado por process_data.py (CSV) y servidor.py (API). Los valores se repiten
+muchísimo (mismas fechas, mismas duraciones), así que cada conversión pasa
+por un cache acotado y los patrones están precompilados.
+"""
+
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+MESES_ES = {
+    'ene': 1, 'feb': 2, 'mar': 3, 'abr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'ago': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dic': 12
+}
+
+CACHE_SIZE = 8192
+
+_ISO_DUR = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(?:\d+\.)?(\d+)S)?")
+_DUR_H   = re.compile(r"(\d+)H")
+_DUR_M   = re.compile(r"(\d+)M")
+_DUR_S   = re.compile(r"(\d+)S")
+
+# ── Jira ────────────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _jira_day(date_part):
+    try:
+        day, mon, year = date_part.split('/')
+        month = MESES_ES.get(mon.lower().replace('.', ''), 0)
+        if not month:
+            return None
+        full_year = 2000 + int(year) if int(year) < 100 else int(year)
+        return datetime(full_year, month, int(day))
+    except Exception:
+        return None
+
+def parse_jira_date(date_str):
+    """'19/ene/26 10:40 AM' → datetime(2026, 1, 19). Solo se cachea la parte de la fecha."""
+    if not date_str or not date_str.strip():
+        return None
+    return _jira_day(date_str.strip().split(' ')[0])
+
+@lru_cache(maxsize=CACHE_SIZE)
+def seconds_to_hours(s):
+    """'5400' (segundos, como viene en el CSV) → 1.5 horas."""
+    if not s or not s.strip():
+        return None
+    try:
+        return round(int(s) / 3600, 2)
+    except Exception:
+        return None
+
+@lru_cache(maxsize=CACHE_SIZE)
+def iso_date(s):
+    """'2026-01-19' → date (para diferencias en días)."""
+    return date.fromisoformat(s)
+
+# ── Clockify ────────────────────────────────────────────────────────────────
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_iso_duration(s):
+    """PT1H30M15S → float horas"""
+    if not s or not s.startswith("PT"):
+        return 0.0
+    m = _ISO_DUR.fullmatch(s)
+    if m:
+        h, mi, sec = m.groups()
+        return int(h or 0) + int(mi or 0) / 60 + int(sec or 0) / 3600
+    # Formatos raros: mismo criterio que antes (buscar cada componente suelto)
+    h   = int(_DUR_H.search(s).group(1)) if "H" in s else 0
+    mi  = int(_DUR_M.search(s).group(1)) if "M" in s else 0
+    sec = int(_DUR_S.search(s).group(1)) if "S" in s else 0
+    return h + mi / 60 + sec / 3600
+
+def parse_iso_durations(values):
+    """Lista de duraciones ISO → lista de horas. Cada valor distinto se convierte
+    una sola vez, sin pasar por el cache en cada elemento."""
+    conv = {s: parse_iso_duration(s) for s in set(values)}
+    return list(map(conv.__getitem__, values))
@@ -0,0 +1,112 @@
+"""
+perfilado.py – Perfil de CPU y memoria de un refresco, a pedido
+================================================================
+Corre una función (fetch_all, el armado de process_data.py) bajo cProfile y
+deja en `perfiles/`:
+  · <nombre>-<fecha>.prof  el perfil completo (pstats, snakeviz, ...)
+  · <nombre>-<fecha>.txt   las top-N funciones por tiempo propio y acumulado
+                           y, con memoria=True, las líneas que más memoria tenían
+                           asignada en el momento de mayor uso
+
+La memoria se sigue con tracemalloc: un hilo toma una foto cada SAMPLE_SECS y
+se queda con la de mayor uso, que es la que explica el pico.
+cProfile solo ve el hilo que llama; conviene correr las descargas en serie.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+PROFILE_DIR = "perfiles"
+TOP_N       = 30
+SAMPLE_SECS = 0.25
+
+_lock = threading.Lock()
+
+
+class PerfilEnCurso(RuntimeError):
+    pass
+
+
+def _muestrear(stop, best):
+    while not stop.wait(SAMPLE_SECS):
+        cur = tracemalloc.get_traced_memory()[0]
+        if cur > best["bytes"]:
+            best["bytes"], best["snap"] = cur, tracemalloc.take_snapshot()
+
+def _top_funciones(stats, key, top):
+    rows = sorted(stats.stats.items(), key=lambda kv: kv[1][key], reverse=True)[:top]
+    return [{"funcion":     f"{os.path.basename(f)}:{line}({name})",
+             "llamadas":    nc,
+             "propio_s":    round(tt, 4),
+             "acumulado_s": round(ct, 4)}
+            for (f, line, name), (cc, nc, tt, ct, _) in rows]
+
+def _top_memoria(snap, top):
+    snap = snap.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                               tracemalloc.Filter(False, "<frozen importlib._bootstrap>")))
+    return [{"linea": str(s.traceback[0]), "mib": round(s.size / 2**20, 2), "bloques": s.count}
+            for s in snap.statistics("lineno")[:top]]
+
+
+def perfilar(fn, nombre, carpeta=PROFILE_DIR, memoria=False, top=TOP_N):
+    """Corre fn() perfilada; devuelve (resultado, resumen). Un solo perfilado a la vez."""
+    if not _lock.acquire(blocking=False):
+        raise PerfilEnCurso("Ya hay un perfilado en curso")
+    try:
+        best, stop = {"bytes": 0, "snap": None}, threading.Event()
+        if memoria:
+            tracemalloc.start()
+            sampler = threading.Thread(target=_muestrear, args=(stop, best), daemon=True)
+            sampler.start()
+        prof = cProfile.Profile()
+        t0   = time.perf_counter()
+        prof.enable()
+        try:
+            result = fn()
+        finally:
+            prof.disable()
+            segundos = time.perf_counter() - t0
+            if memoria:
+                stop.set()
+                sampler.join()
+                cur, peak = tracemalloc.get_traced_memory()
+                if cur >= best["bytes"]:
+                    best["bytes"], best["snap"] = cur, tracemalloc.take_snapshot()
+                tracemalloc.stop()
+
+        os.makedirs(carpeta, exist_ok=True)
+        base  = os.path.join(carpeta, f"{nombre}-{datetime.now():%Y%m%d-%H%M%S}")
+        prof.dump_stats(base + ".prof")
+        stats = pstats.Stats(prof)
+        resumen = {
+            "segundos":       round(segundos, 3),
+            "perfil":         base + ".prof",
+            "resumen":        base + ".txt",
+            "top_propio":     _top_funciones(stats, 2, top),
+            "top_acumulado":  _top_funciones(stats, 3, top),
+        }
+        if memoria:
+            resumen["memoria_pico_mib"] = round(peak / 2**20, 2)
+            resumen["top_memoria"]      = _top_memoria(best["snap"], top)
+
+        out = io.StringIO()
+        out.write(f"{nombre} · {segundos:.3f} s\n\n")
+        for titulo, orden in (("Tiempo propio", "tottime"), ("Tiempo acumulado", "cumulative")):
+            out.write(f"── {titulo} (top {top}) ──\n")
+            pstats.Stats(prof, stream=out).sort_stats(orden).print_stats(top)
+        if memoria:
+            out.write(f"── Memoria: pico {resumen['memoria_pico_mib']} MiB, "
+                      f"foto con {best['bytes'] / 2**20:.1f} MiB asignados ──\n")
+            for m in resumen["top_memoria"]:
+                out.write(f"{m['mib']:10.2f} MiB {m['bloques']:>9} bloques  {m['linea']}\n")
+        with open(resumen["resumen"], "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        return result, resumen
+    finally:
+        _lock.release()
@@ -1,262 +1,461 @@
+import argparse
 import csv
+import glob
+import hashlib
+import io
 import json
+import os
+import re
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from operator import itemgetter
 
-MESES_ES = {
-    'ene': 1, 'feb': 2, 'mar': 3, 'abr': 4, 'may': 5, 'jun': 6,
-    'jul': 7, 'ago': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dic': 12
-}
-
-ESTADOS_FINALIZADOS = {
-    'finalizada', 'cerrado', 'resuelto', 'done', 'closed', 'resolved',
-    'completado', 'completada', 'terminado', 'terminada'
-}
-
-def parse_jira_date(date_str):
-    if not date_str or not date_str.strip():
-        return None
-    try:
-        parts = date_str.strip().split(' ')
-        date_part = parts[0]
-        day, mon, year = date_part.split('/')
-        month = MESES_ES.get(mon.lower().replace('.', ''), 0)
-        if not month:
-            return None
-        full_year = 2000 + int(year) if int(year) < 100 else int(year)
-        return datetime(full_year, month, int(day))
-    except Exception:
-        return None
+from agregador import Agregador, horas_consumidas, semaforo_fecha, semaforo_horas
+from almacen import Almacen, entrada
+from historial import Historial
+from mapeos import CLIENT_COLORS, DEFAULT_COLOR, ESTADOS_DONE, JIRA_TO_CLIENT
+from parseo import parse_jira_date, seconds_to_hours
+from perfilado import perfilar
+from tareas import Tarea
 
 def format_date(dt):
     if dt is None:
         return None
     return dt.strftime('%Y-%m-%d')
 
-def seconds_to_hours(s):
-    if not s or not s.strip():
-        return None
-    try:
-        return round(int(s) / 3600, 2)
-    except Exception:
-        return None
-
-# ── Mappings ────────────────────────────────────────────────────────────────
-
-CLIENT_JIRA_MAP = {
-    "Transener": [
-        "TRANSENER TESLA",
-        "TRANSENER Costeo Emplazamiento",
-        "TRANSENER Mantenimiento",
-    ],
-    "SACDE": [
-        "SACDE - Francos",
-        "SACDE - Equipos",
-        "SACDE - Partes Diarios",
-        "SACDE APP MATERIALES",
-        "SACDE Mantenimiento",
-        "SACDE PORTAL",
-    ],
-    "Bayer": ["Bayer"],
-    "Pampa Energia": ["PAMPA Almacenes Mejoras"],
-}
-
-JIRA_TO_CLIENT = {}
-for _client, _projs in CLIENT_JIRA_MAP.items():
-    for _p in _projs:
-        JIRA_TO_CLIENT[_p] = _client
-
-CLOCKIFY_TO_JIRA = {
-    "Tesla": "TRANSENER TESLA",
-    "Costeo de Emplazamiento": "TRANSENER Costeo Emplazamiento",
-    "Migración S4": "TRANSENER Mantenimiento",
-    "Interface de Francos Compensatorios": "TRANSENER Mantenimiento",
-    "Trello": "TRANSENER Mantenimiento",
-    "Premios": "TRANSENER Mantenimiento",
-    "Paquete 4 ''Francos APK''": "SACDE - Francos",
-    "Portal de Proveedores FASE 1": "SACDE PORTAL",
-    "Portal de Proveedores FASE 2": "SACDE PORTAL",
-    "Auditoria Seguridad": "SACDE Mantenimiento",
-    "Soporte": "SACDE Mantenimiento",
-    "Consultoria FICO": "SACDE Mantenimiento",
-    "App Facilites": "Bayer",
-    "Mejoras Solped": "Bayer",
-    "Mejoras App Almacenes- Fase 2": "PAMPA Almacenes Mejoras",
-}
-
-CLIENT_COLORS = {
-    "Transener":   "#6366f1",
-    "SACDE":       "#f59e0b",
-    "Bayer":       "#3b82f6",
-    "Pampa Energia": "#10b981",
-}
-
 # ── Clockify processing ─────────────────────────────────────────────────────
 
-def process_clockify(csv_file):
-    by_jira_project = {}
-    by_client = {}
+def read_clockify(csv_file):
+    """Filas del export → (identidad, proyecto, cliente, usuario, fecha, horas, n° de fila).
 
+    La identidad (persona, proyecto, tarea, descripción e intervalo) reconoce la
+    misma entrada en dos exports que se solapan.
+    """
+    rows = []
     with open(csv_file, encoding='utf-8-sig') as f:
         reader = csv.reader(f)
         next(reader)
-        for row in reader:
+        for n, row in enumerate(reader, 1):
             if len(row) < 16:
                 continue
-            project = row[0].strip()
-            client  = row[1].strip()
-            user    = row[5].strip()
-            task    = row[3].strip()
             try:
                 duration = float(row[15])
             except Exception:
                 duration = 0
-
-            jira_proj   = CLOCKIFY_TO_JIRA.get(project)
-            jira_client = JIRA_TO_CLIENT.get(jira_proj, client)
-
-            if jira_proj:
-                d = by_jira_project.setdefault(jira_proj, {'total': 0, 'users': {}, 'tasks': {}})
-                d['total'] += duration
-                d['users'][user] = d['users'].get(user, 0) + duration
-                if task:
-                    d['tasks'][task] = d['tasks'].get(task, 0) + duration
-
-            eff_client = jira_client if jira_proj else client
-            if eff_client and eff_client.strip():
-                c = by_client.setdefault(eff_client, {'total': 0, 'users': {}})
-                c['total'] += duration
-                c['users'][user] = c['users'].get(user, 0) + duration
-
-    return by_jira_project, by_client
+            d, m, y = (row[10].split('/') + ['', '', ''])[:3]
+            fecha   = f"{y}-{m.zfill(2)}-{d.zfill(2)}" if y else None
+            ident   = '\t'.join(c.strip() for c in (row[7] or row[5], row[0], row[3], row[2],
+                                                    row[10], row[11], row[12], row[13]))
+            rows.append((ident, row[0].strip(), row[1].strip(), row[5].strip(), fecha, duration, n))
+    return rows
+
+def _add_clockify(row, nombre, agg, entradas):
+    _, project, client, user, fecha, duration, n = row
+    # Sin mapeo a Jira, las horas cuentan para el cliente que trae Clockify
+    agg.add_time(project, user, duration, client or None)
+    if entradas is not None:
+        entradas.append(entrada(f"{nombre}:{n}", project, user, fecha, duration, client or None))
+
+def process_clockify(csv_file, agg, entradas=None):
+    """Suma las horas al agregador; si se pasa `entradas` (lista) también junta
+    cada fila para guardarla en la base SQLite."""
+    nombre = os.path.basename(csv_file)
+    for row in read_clockify(csv_file):
+        _add_clockify(row, nombre, agg, entradas)
+    return agg
 
 # ── Jira processing ─────────────────────────────────────────────────────────
 
-def process_jira(csv_file):
-    today = datetime.today()
-    clients = {}
-
-    with open(csv_file, encoding='utf-8-sig') as f:
-        reader = csv.reader(f)
-        next(reader)
-        for row in reader:
-            if len(row) < 55:
-                continue
-
-            resumen   = row[0].strip()
-            issue_key = row[1].strip()
-            estado    = row[4].strip()
-            proyecto  = row[6].strip()
-            asignado  = row[13].strip() or 'Sin asignar'
+# Columnas que se usan del export, por nombre de encabezado (si un nombre se
+# repite, como Etiquetas o Interesados, vale la primera aparición)
+JIRA_COLUMNS = (
+    'Resumen',
+    'Clave de incidencia',
+    'Estado',
+    'Nombre del proyecto',
+    'Persona asignada',
+    'Resuelta',
+    'Fecha de vencimiento',
+    'Estimación original',
+    'Trabajo restante estimado',
+    'Tiempo Trabajado',
+)
+
+JIRA_PARALLEL_MIN = 32 * 1024 * 1024   # bytes; exports más chicos se parsean en un solo proceso
+JIRA_CHUNK_SIZE   = 8 * 1024 * 1024
+JIRA_MIN_COLS     = 55                 # filas más cortas se saltean (columnas de horas incompletas)
+JIRA_SCAN_WINDOW  = 256 * 1024         # bytes que se leen desde cada corte tentativo
+JIRA_SCAN_MAX     = 8 * 1024 * 1024    # ventana máxima antes de contar comillas desde el corte anterior
+JIRA_SCAN_RECORDS = 4                  # registros que tienen que parsear bien para aceptar un corte
+
+def jira_column_indexes(header):
+    idx = {}
+    for i, name in enumerate(header):
+        idx.setdefault(name.strip(), i)
+    missing = [c for c in JIRA_COLUMNS if c not in idx]
+    if missing:
+        raise ValueError(f"Faltan columnas en el export de Jira: {', '.join(missing)}")
+    return tuple(idx[c] for c in JIRA_COLUMNS)
+
+def jira_task(fields, today):
+    """Campos de JIRA_COLUMNS de una fila → (cliente, proyecto, Tarea) o None."""
+    (resumen, issue_key, estado, proyecto, asignado,
+     resuelta, vencimiento, estimacion, restante, trabajado) = fields
+
+    resumen   = resumen.strip()
+    issue_key = issue_key.strip()
+    estado    = estado.strip()
+    proyecto  = proyecto.strip()
+    asignado  = asignado.strip() or 'Sin asignar'
+
+    client = JIRA_TO_CLIENT.get(proyecto)
+    if not client:
+        return None
 
-            client = JIRA_TO_CLIENT.get(proyecto)
-            if not client:
-                continue
+    horas_est    = seconds_to_hours(estimacion)
+    horas_rest   = seconds_to_hours(restante)
+    horas_worked = seconds_to_hours(trabajado)
+
+    fecha_fin        = parse_jira_date(vencimiento)  # due date
+    fecha_resolucion = parse_jira_date(resuelta)     # resolved date
+
+    es_finalizado = estado.lower() in ESTADOS_DONE
+
+    # Deviation (days): positive = late, negative = early
+    desvio_dias = None
+    if fecha_fin and fecha_resolucion:
+        desvio_dias = (fecha_resolucion - fecha_fin).days
+
+    horas_consumed_eff = horas_consumidas(horas_worked, horas_est, horas_rest)
+    semaforo_f = semaforo_fecha(fecha_fin, fecha_resolucion, es_finalizado, today)
+    semaforo_h = semaforo_horas(horas_est, horas_consumed_eff, es_finalizado)
+
+    task = Tarea(
+        id               = issue_key,
+        resumen          = resumen,
+        estado           = estado,
+        persona          = asignado,
+        horas_estimadas  = horas_est,
+        horas_consumidas = horas_consumed_eff,
+        horas_pendientes = horas_rest,
+        fecha_fin        = format_date(fecha_fin),
+        fecha_fin_real   = format_date(fecha_resolucion),
+        desvio_dias      = desvio_dias,
+        sem_fecha        = semaforo_f,
+        sem_horas        = semaforo_h,
+        es_finalizado    = es_finalizado,
+    )
 
-            horas_est    = seconds_to_hours(row[51])
-            horas_rest   = seconds_to_hours(row[52])
-            horas_worked = seconds_to_hours(row[53])
-
-            fecha_fin        = parse_jira_date(row[23])  # due date
-            fecha_resolucion = parse_jira_date(row[22])  # resolved date
-
-            es_finalizado = estado.lower() in ESTADOS_FINALIZADOS
-
-            # Deviation (days): positive = late, negative = early
-            desvio_dias = None
-            if fecha_fin and fecha_resolucion:
-                desvio_dias = (fecha_resolucion - fecha_fin).days
-
-            # ── Semáforo fechas ──────────────────────────────────────────
-            if fecha_fin:
-                if es_finalizado:
-                    if desvio_dias is not None:
-                        semaforo_fecha = 'verde' if desvio_dias <= 0 else 'rojo'
-                    else:
-                        semaforo_fecha = 'verde'
-                else:
-                    dias_restantes = (fecha_fin - today).days
-                    if dias_restantes < 0:
-                        semaforo_fecha = 'rojo'
-                    elif dias_restantes <= 7:
-                        semaforo_fecha = 'amarillo'
-                    else:
-                        semaforo_fecha = 'verde'
+    return client, proyecto, task
+
+def _iter_jira_fields(lines, cols):
+    get     = itemgetter(*cols)
+    min_len = max(JIRA_MIN_COLS, max(cols) + 1)
+    for row in csv.reader(lines):
+        if len(row) >= min_len:
+            yield get(row)
+
+def _iter_jira_rows(lines, cols, today):
+    for fields in _iter_jira_fields(lines, cols):
+        t = jira_task(fields, today)
+        if t:
+            yield t
+
+def _next_record(buf, pos, inside):
+    """(offset donde empieza el registro siguiente a `pos`, estado de comillas).
+
+    Un salto de línea es fin de registro solo fuera de comillas (dentro está en
+    un campo como Descripción); `inside` es el estado en `pos`. Si buf se termina
+    antes devuelve (-1, estado al final de buf).
+    """
+    while True:
+        if inside:
+            q = buf.find(b'"', pos)
+            if q == -1:
+                return -1, True
+            inside, pos = False, q + 1
+        else:
+            nl = buf.find(b'\n', pos)
+            q  = buf.find(b'"', pos, len(buf) if nl == -1 else nl)
+            if q != -1:
+                inside, pos = True, q + 1
+            elif nl != -1:
+                return nl + 1, False
             else:
-                semaforo_fecha = 'gris'
+                return -1, False
+
+def _parsea_bien(buf, pos, ncols, eof):
+    """¿Los JIRA_SCAN_RECORDS registros desde `pos` tienen `ncols` columnas?
+    None si la ventana no alcanza para decidir."""
+    for _ in range(JIRA_SCAN_RECORDS):
+        if pos >= len(buf):
+            return True if eof else None
+        end, _ = _next_record(buf, pos, False)
+        if end == -1:
+            if not eof:
+                return None
+            end = len(buf)
+        try:
+            rows = list(csv.reader(io.StringIO(buf[pos:end].decode('utf-8'), newline='')))
+        except (UnicodeDecodeError, csv.Error):
+            return False
+        if len(rows) != 1 or len(rows[0]) != ncols:
+            return False
+        pos = end
+    return True
+
+def _quote_parity(f, start, end):
+    """True si entre start y end hay una cantidad impar de comillas (se lee en bloques)."""
+    f.seek(start)
+    n, left = 0, end - start
+    while left > 0:
+        block = f.read(min(left, 1 << 20))
+        if not block:
+            break
+        n    += block.count(b'"')
+        left -= len(block)
+    return n % 2 == 1
+
+def _cut_near(f, prev, target, ncols, total):
+    """Primer comienzo de registro desde `target` (None si no hay otro), sin leer
+    el archivo entero.
+
+    Desde `target` no se sabe si se está dentro de comillas: se prueban las dos
+    hipótesis y vale la única que deja registros de `ncols` columnas. Si las dos
+    (o ninguna) sirven, se cuentan las comillas desde `prev`, que sí es un
+    comienzo de registro, y se sigue con el estado exacto.
+    """
+    window = JIRA_SCAN_WINDOW
+    while True:
+        f.seek(target)
+        buf = f.read(window)
+        eof = target + len(buf) >= total
+        res = {}
+        for inside in (False, True):
+            pos, _ = _next_record(buf, 0, inside)
+            res[pos] = False if pos == -1 else _parsea_bien(buf, pos, ncols, eof)
+        if None not in res.values() and list(res.values()).count(True) == 1:
+            return target + next(p for p, ok in res.items() if ok)
+        if None not in res.values() or eof or window >= JIRA_SCAN_MAX:
+            break
+        window *= 2
+
+    inside, pos = _quote_parity(f, prev, target), target
+    f.seek(target)
+    while True:
+        block = f.read(1 << 20)
+        if not block:
+            return None
+        end, inside = _next_record(block, 0, inside)
+        if end != -1:
+            return pos + end
+        pos += len(block)
+
+def _record_boundaries(f, start, size, ncols):
+    """Offsets donde empieza un registro, cada ~size bytes desde `start`, y el tamaño
+    del archivo al final. Solo se lee alrededor de cada corte."""
+    total = os.fstat(f.fileno()).st_size
+    cuts  = [start]
+    while cuts[-1] + size < total:
+        cut = _cut_near(f, cuts[-1], cuts[-1] + size, ncols, total)
+        if cut is None or cut >= total:
+            break
+        cuts.append(cut)
+    cuts.append(total)
+    return cuts
+
+def _read_chunk(csv_file, start, end):
+    with open(csv_file, 'rb') as f:
+        f.seek(start)
+        return io.StringIO(f.read(end - start).decode('utf-8'), newline='')
+
+def _parse_jira_chunk(args):
+    csv_file, start, end, cols, today = args
+    return list(_iter_jira_rows(_read_chunk(csv_file, start, end), cols, today))
+
+def _jira_fields_chunk(csv_file, start, end, cols):
+    return list(_iter_jira_fields(_read_chunk(csv_file, start, end), cols))
+
+def _jira_chunks(csv_file):
+    """(columnas, cortes): bloques alineados a registros, uno solo si el archivo
+    es más chico que JIRA_PARALLEL_MIN."""
+    with open(csv_file, 'rb') as f:
+        window = JIRA_SCAN_WINDOW
+        while True:                                 # fin del encabezado
+            f.seek(0)
+            head = f.read(window)
+            first, _ = _next_record(head, 0, False)
+            if first != -1 or len(head) < window:
+                first = len(head) if first == -1 else first
+                break
+            window *= 2
+        header = next(csv.reader(io.StringIO(head[:first].decode('utf-8-sig'), newline='')), [])
+        total  = os.fstat(f.fileno()).st_size
+        size   = JIRA_CHUNK_SIZE if total >= JIRA_PARALLEL_MIN else total
+        return jira_column_indexes(header), _record_boundaries(f, first, size, len(header))
+
+def process_jira(csv_file, agg, workers=None):
+    """Lee el export de Jira en streaming, tomando solo las columnas de JIRA_COLUMNS.
+
+    Exports de más de JIRA_PARALLEL_MIN se cortan en bloques alineados a
+    registros y se parsean en un pool de procesos; el resultado es el mismo
+    que el del camino secuencial (mismo orden de tareas).
+    """
+    today = datetime.today()
 
-            # Effective consumed hours (if worked not available, infer from est - rest)
-            if horas_worked is None and horas_est is not None and horas_rest is not None:
-                horas_consumed_eff = round(horas_est - horas_rest, 2)
-            else:
-                horas_consumed_eff = horas_worked
-
-            # ── Semáforo horas ───────────────────────────────────────────
-            if horas_est is not None and horas_consumed_eff is not None:
-                if horas_consumed_eff > horas_est:
-                    semaforo_horas = 'rojo'
-                elif not es_finalizado and horas_est > 0 and (horas_consumed_eff / horas_est) >= 0.8:
-                    semaforo_horas = 'amarillo'
-                else:
-                    semaforo_horas = 'verde'
-            else:
-                semaforo_horas = 'gris'
-
-            task = {
-                "id":               issue_key,
-                "resumen":          resumen,
-                "estado":           estado,
-                "persona":          asignado,
-                "horas_estimadas":  horas_est,
-                "horas_consumidas": horas_consumed_eff,
-                "horas_pendientes": horas_rest,
-                "fecha_fin":        format_date(fecha_fin),
-                "fecha_fin_real":   format_date(fecha_resolucion),
-                "desvio_dias":      desvio_dias,
-                "sobre_estimacion": semaforo_horas == 'rojo',
-                "es_finalizado":    es_finalizado,
-                "semaforo_fecha":   semaforo_fecha,
-                "semaforo_horas":   semaforo_horas,
-            }
-
-            clients.setdefault(client, {}).setdefault(proyecto, []).append(task)
-
-    return clients
+    with open(csv_file, encoding='utf-8-sig', newline='') as f:
+        header = next(csv.reader(f))
+        cols   = jira_column_indexes(header)
+        size   = os.fstat(f.fileno()).st_size
+        if workers == 1 or size < JIRA_PARALLEL_MIN:
+            rows = list(_iter_jira_rows(f, cols, today))
+        else:
+            rows = None
+
+    if rows is None:
+        _, cuts = _jira_chunks(csv_file)
+        chunks  = [(csv_file, a, b, cols, today) for a, b in zip(cuts, cuts[1:]) if b > a]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = [t for part in pool.map(_parse_jira_chunk, chunks) for t in part]
+
+    for client, proyecto, task in rows:
+        agg.upsert(client, proyecto, task)
+
+    return agg
+
+# ── Varios exports: parseo en paralelo y cache por archivo ──────────────────
+
+CLOCKIFY_CSV  = 'Clockify_Time_Report_Detailed_01_01_2026-31_01_2026.csv'
+JIRA_CSV      = 'Jira-2.csv'
+CACHE_DIR     = '.csv_cache'   # oculto: servidor.py no sirve rutas que empiezan con "."
+CACHE_VERSION = 2              # subirlo si cambia lo que se guarda (p.ej. JIRA_COLUMNS)
+
+def expandir(patrones):
+    """Archivos, directorios (sus *.csv) o globs → lista sin repetidos, ordenada
+    dentro de cada patrón (los exports con fecha en el nombre quedan en orden)."""
+    archivos = []
+    for p in patrones:
+        found = glob.glob(os.path.join(p, '*.csv')) if os.path.isdir(p) else glob.glob(p)
+        for a in sorted(found) or [p]:      # un nombre que no existe falla al abrirlo
+            if a not in archivos:
+                archivos.append(a)
+    return archivos
+
+def _hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _cache_path(cache, tipo, digest):
+    return os.path.join(cache, f"{tipo}-v{CACHE_VERSION}-{digest}.json")
+
+def _cache_read(cache, tipo, digest):
+    try:
+        with open(_cache_path(cache, tipo, digest), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def parse_files(archivos, workers=None, cache=CACHE_DIR):
+    """[(tipo, path)] → {(tipo, path): filas}, con tipo 'clockify' o 'jira'.
+
+    Lo parseado (las columnas que se usan, todavía sin clasificar: eso depende de
+    los mapeos y de la fecha de hoy) se guarda en `cache` bajo el hash del
+    contenido; solo se parsean los archivos nuevos o modificados, todos a la vez
+    en un pool de procesos (los exports de Jira grandes, además, por bloques).
+    """
+    parsed, pending = {}, []
+    for tipo, path in archivos:
+        digest = _hash(path)
+        rows   = _cache_read(cache, tipo, digest) if cache else None
+        if rows is None:
+            pending.append((tipo, path, digest))
+        else:
+            parsed[(tipo, path)] = rows
+
+    jobs = []
+    for tipo, path, _ in pending:
+        if tipo == 'clockify':
+            jobs.append(((tipo, path), read_clockify, (path,)))
+        else:
+            cols, cuts = _jira_chunks(path)
+            jobs += [((tipo, path), _jira_fields_chunk, (path, a, b, cols))
+                     for a, b in zip(cuts, cuts[1:]) if b > a]
+    if workers == 1 or len(jobs) <= 1:
+        results = [fn(*a) for _, fn, a in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [f.result() for f in [pool.submit(fn, *a) for _, fn, a in jobs]]
+
+    for (key, _, _), rows in zip(jobs, results):
+        parsed.setdefault(key, []).extend(rows)
+    for tipo, path, digest in pending:
+        rows = parsed.setdefault((tipo, path), [])
+        if cache:
+            os.makedirs(cache, exist_ok=True)
+            escribir_atomico(_cache_path(cache, tipo, digest),
+                             json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    print(f"  {len(archivos)} archivos, {len(pending)} parseados "
+          f"y {len(archivos) - len(pending)} desde {cache or 'cache'}")
+    return parsed
+
+def procesar_archivos(clockify, jira, agg, entradas=None, workers=None, cache=CACHE_DIR):
+    """Varios exports de Clockify y de Jira → agg, sin contar dos veces lo solapado.
+
+    Jira: cada clave de incidencia vale una vez; si varios exports la traen gana
+    el último de la lista. Clockify: una entrada que aparece en varios exports se
+    suma una vez (las repetidas dentro de un mismo export se respetan).
+    """
+    parsed = parse_files([('clockify', p) for p in clockify] + [('jira', p) for p in jira],
+                         workers, cache)
+
+    vistas = Counter()   # identidad → veces que ya se sumó
+    for path in clockify:
+        nombre, propias = os.path.basename(path), Counter()
+        for row in parsed[('clockify', path)]:
+            propias[row[0]] += 1
+            if propias[row[0]] > vistas[row[0]]:
+                _add_clockify(row, nombre, agg, entradas)
+        vistas |= propias
+
+    today  = datetime.today()
+    issues = {}
+    for path in jira:
+        for fields in parsed[('jira', path)]:
+            issues[fields[1].strip()] = fields
+    for fields in issues.values():
+        t = jira_task(fields, today)
+        if t:
+            agg.upsert(*t)
+
+    return agg
 
 # ── Build final structure ───────────────────────────────────────────────────
 
-def build_dashboard(jira_by_client, cw_by_project, cw_by_client):
+def build_dashboard(agg):
     clientes_list = []
 
-    for client_name in sorted(jira_by_client.keys()):
-        projects = jira_by_client[client_name]
-        total_est = 0
-        total_consumed_jira = 0
-        total_pending_jira = 0
-        total_tareas = 0
+    for client_name in sorted(agg.clientes()):
+        projects = agg.projects[client_name]
         proyectos_list = []
 
         for proj_nombre in sorted(projects.keys()):
-            tareas = projects[proj_nombre]
-            cw = cw_by_project.get(proj_nombre, {})
-
-            proj_est      = sum(t['horas_estimadas']  or 0 for t in tareas)
-            proj_consumed = sum(t['horas_consumidas'] or 0 for t in tareas)
-            proj_pending  = sum(t['horas_pendientes'] or 0 for t in tareas)
-
-            total_est           += proj_est
-            total_consumed_jira += proj_consumed
-            total_pending_jira  += proj_pending
-            total_tareas        += len(tareas)
+            tareas, proj_est, proj_consumed, proj_pending = agg.proyecto(client_name, proj_nombre)
+            cw = agg.clockify_proyecto(proj_nombre)
 
             cw_users = [
                 {"nombre": u, "horas": round(h, 2)}
-                for u, h in sorted(cw.get('users', {}).items(), key=lambda x: -x[1])
+                for u, h in sorted(cw['users'].items(), key=lambda x: -x[1])
             ]
 
             tareas_sorted = sorted(tareas, key=lambda t: (
-                t['horas_estimadas'] is None,
-                t['fecha_fin'] is None,
-                t['fecha_fin'] or ''
+                t.horas_estimadas is None,
+                t.fecha_fin is None,
+                t.fecha_fin or ''
             ))
 
             proyectos_list.append({
@@ -264,22 +463,22 @@ def build_dashboard(jira_by_client, cw_by_project, cw_by_client):
                 "horas_estimadas":           round(proj_est, 2),
                 "horas_consumidas_jira":     round(proj_consumed, 2),
                 "horas_pendientes_jira":     round(proj_pending, 2),
-                "horas_consumidas_clockify": round(cw.get('total', 0), 2),
+                "horas_consumidas_clockify": round(cw['total'], 2),
                 "personas_clockify":         cw_users,
                 "total_tareas":              len(tareas),
                 "tareas":                    tareas_sorted,
             })
 
-        client_cw = cw_by_client.get(client_name, {})
+        total_est, total_consumed_jira, total_pending_jira, total_tareas = agg.cliente(client_name)
 
         clientes_list.append({
             "nombre":  client_name,
-            "color":   CLIENT_COLORS.get(client_name, "#667eea"),
+            "color":   CLIENT_COLORS.get(client_name, DEFAULT_COLOR),
             "kpis": {
                 "horas_estimadas":           round(total_est, 2),
                 "horas_consumidas_jira":     round(total_consumed_jira, 2),
                 "horas_pendientes_jira":     round(total_pending_jira, 2),
-                "horas_consumidas_clockify": round(client_cw.get('total', 0), 2),
+                "horas_consumidas_clockify": round(agg.clockify_cliente(client_name), 2),
                 "total_tareas":              total_tareas,
                 "total_proyectos":           len(projects),
             },
@@ -291,29 +490,132 @@ def build_dashboard(jira_by_client, cw_by_project, cw_by_client):
         "clientes": clientes_list,
     }
 
-# ── Main ────────────────────────────────────────────────────────────────────
+def json_default(o):
+    # Las tareas se materializan como dict recién al escribir el JSON
+    if isinstance(o, Tarea):
+        return o.as_dashboard_dict()
+    raise TypeError(f"{type(o).__name__} no es serializable")
+
+# ── Salida ──────────────────────────────────────────────────────────────────
+
+def serializar(obj, compacto=False):
+    """JSON en bytes: con indent=2 como siempre, o compacto (sin espacios)."""
+    if compacto:
+        text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=json_default)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, indent=2, default=json_default)
+    return text.encode('utf-8')
+
+def escribir_atomico(path, data):
+    """Escribe en un temporal y lo renombra: quien lee ve el archivo viejo o el nuevo, nunca uno a medias."""
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def escribir_dashboard(dashboard, base='dashboard_data', compacto=False):
+    """Serializa una sola vez; el .js envuelve los mismos bytes que el .json."""
+    data = serializar(dashboard, compacto)
+    escribir_atomico(f"{base}.json", data)   # JSON (por compatibilidad)
+    escribir_atomico(f"{base}.js", b'window.DASHBOARD_DATA = ' + data + b';\n')   # para abrir index.html sin servidor
+
+def _slug(nombre):
+    ascii_ = unicodedata.normalize('NFKD', nombre).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', ascii_.lower()).strip('-') or 'cliente'
+
+def escribir_shards(dashboard, carpeta, compacto=False):
+    """Un archivo por cliente (<slug>.json/.js) más index.json/.js con nombre, color,
+    KPIs y archivo de cada uno, para cargar solo la pestaña que se mira.
+
+    El índice se escribe al final: nunca apunta a un shard que todavía no existe.
+    Dos clientes con el mismo slug ("Bayer" y "BAYER ", o que solo difieren en
+    acentos) no se pisan: el segundo lleva "-2", el tercero "-3", etc.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    indice = {"generado": dashboard['generado'], "clientes": []}
+    usados = {'index'}
+    for c in dashboard['clientes']:
+        base, n = _slug(c['nombre']), 1
+        archivo = base
+        while archivo in usados:
+            n      += 1
+            archivo = f"{base}-{n}"
+        usados.add(archivo)
+        data    = serializar(c, compacto)
+        nombre  = json.dumps(c['nombre'], ensure_ascii=False).encode('utf-8')
+        escribir_atomico(os.path.join(carpeta, f"{archivo}.json"), data)
+        escribir_atomico(os.path.join(carpeta, f"{archivo}.js"),
+                         b'(window.DASHBOARD_SHARDS = window.DASHBOARD_SHARDS || {})[' + nombre +
+                         b'] = ' + data + b';\n')
+        indice['clientes'].append({"nombre":  c['nombre'],
+                                   "color":   c['color'],
+                                   "kpis":    c['kpis'],
+                                   "archivo": archivo})
+    data = serializar(indice, compacto)
+    escribir_atomico(os.path.join(carpeta, 'index.json'), data)
+    escribir_atomico(os.path.join(carpeta, 'index.js'), b'window.DASHBOARD_INDEX = ' + data + b';\n')
 
-if __name__ == '__main__':
-    print("Procesando datos...")
+# ── Main ────────────────────────────────────────────────────────────────────
 
-    cw_by_project, cw_by_client = process_clockify(
-        'Clockify_Time_Report_Detailed_01_01_2026-31_01_2026.csv'
-    )
-    jira_by_client = process_jira('Jira-2.csv')
+def generar(args, workers=None):
+    """CSV (o la base SQLite con --desde-sqlite) → estructura del dashboard."""
+    if args.desde_sqlite:
+        agg = Almacen(args.sqlite).agregador(hoy=datetime.today())
+    else:
+        agg      = Agregador()
+        entradas = [] if args.sqlite else None
+        procesar_archivos(expandir(args.clockify or [CLOCKIFY_CSV]), expandir(args.jira or [JIRA_CSV]),
+                          agg, entradas, workers, None if args.sin_cache else args.cache)
+        if args.sqlite:
+            Almacen(args.sqlite).guardar(agg, entradas)
 
-    dashboard = build_dashboard(jira_by_client, cw_by_project, cw_by_client)
+    return build_dashboard(agg)
 
-    # JSON (por compatibilidad)
-    with open('dashboard_data.json', 'w', encoding='utf-8') as f:
-        json.dump(dashboard, f, ensure_ascii=False, indent=2)
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description="Genera dashboard_data.json/.js desde los CSV")
+    ap.add_argument('--clockify', metavar='CSV', action='append',
+                    help=f"export de Clockify, directorio o glob; se puede repetir (default {CLOCKIFY_CSV})")
+    ap.add_argument('--jira', metavar='CSV', action='append',
+                    help=f"export de Jira, directorio o glob; se puede repetir (default {JIRA_CSV})")
+    ap.add_argument('--cache', metavar='DIR', default=CACHE_DIR,
+                    help=f"lo parseado de cada archivo, por hash de contenido (default {CACHE_DIR})")
+    ap.add_argument('--sin-cache', action='store_true',
+                    help="parsear todo de nuevo sin leer ni escribir la cache")
+    ap.add_argument('--sqlite', metavar='DB',
+                    help="guardar issues y horas en esta base SQLite")
+    ap.add_argument('--desde-sqlite', action='store_true',
+                    help="armar el dashboard desde la base (--sqlite) sin leer los CSV")
+    ap.add_argument('--historial', metavar='JSONL',
+                    help="agregar los KPIs de esta corrida al historial (p.ej. historial_csv.jsonl)")
+    ap.add_argument('--perfil', action='store_true',
+                    help="perfilar el armado con cProfile y guardar perfil + resumen en perfiles/")
+    ap.add_argument('--perfil-memoria', action='store_true',
+                    help="como --perfil, siguiendo además la memoria con tracemalloc")
+    ap.add_argument('--compacto', action='store_true',
+                    help="JSON sin indentación (mucho más chico)")
+    ap.add_argument('--shards', metavar='DIR',
+                    help="además, un archivo por cliente + index.json/.js en DIR")
+    args = ap.parse_args()
+    if args.desde_sqlite and not args.sqlite:
+        ap.error("--desde-sqlite requiere --sqlite DB")
 
-    # JS embebible (para abrir index.html directo sin servidor)
-    with open('dashboard_data.js', 'w', encoding='utf-8') as f:
-        f.write('window.DASHBOARD_DATA = ')
-        json.dump(dashboard, f, ensure_ascii=False, indent=2)
-        f.write(';\n')
+    print("Procesando datos...")
 
+    if args.perfil or args.perfil_memoria:
+        # Sin pool de procesos: cProfile solo ve el proceso (y el hilo) que lo llama
+        dashboard, perfil = perfilar(lambda: generar(args, workers=1), 'process_data',
+                                     memoria=args.perfil_memoria)
+        print(f"Perfil en {perfil['perfil']} (resumen en {perfil['resumen']})")
+    else:
+        dashboard = generar(args)
+    if args.historial:
+        Historial(args.historial).append(dashboard['clientes'], datetime.now().isoformat(timespec='seconds'))
+
+    escribir_dashboard(dashboard, compacto=args.compacto)
     print("✅ dashboard_data.json y dashboard_data.js generados!")
+    if args.shards:
+        escribir_shards(dashboard, args.shards, compacto=args.compacto)
+        print(f"✅ {len(dashboard['clientes'])} shards por cliente + index en {args.shards}/")
     for c in dashboard['clientes']:
         k = c['kpis']
         print(f"  {c['nombre']}: {k['total_tareas']} tareas | "
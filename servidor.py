@@ -9,13 +9,24 @@ Requiere:  pip install requests
 """
 
 import base64
+import gzip
+import hashlib
+import hmac
 import json
 import os
 import re
+import selectors
+import socket
 import sys
-from datetime import datetime
-from http.server import BaseHTTPRequestHandler, HTTPServer
-from urllib.parse import urlparse
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
 
 try:
     import requests
@@ -23,48 +34,52 @@ except ImportError:
     print("❌  Falta el paquete 'requests'. Instalalo con:\n    pip install requests")
     sys.exit(1)
 
-PORT        = 8765
-CONFIG_FILE = "config.json"
+from agregador import Agregador, horas_consumidas, semaforo_fecha, semaforo_horas
+from almacen import Almacen, entrada
+from historial import Historial
+import mapeos
+from mapeos import (CLIENT_COLORS, CLIENT_JIRA_MAP, CW_TO_JIRA, DEFAULT_COLOR, ESTADOS_DONE,
+                    JIRA_TO_CLIENT)
+from metricas import METRICS
+from parseo import iso_date, parse_iso_duration, parse_iso_durations
+from perfilado import PROFILE_DIR, PerfilEnCurso, perfilar
+from tareas import Tarea
 
-# ── MAPPINGS (deben coincidir con index.html) ────────────────────
-CLIENT_JIRA_MAP = {
-    "Transener":     ["TRANSENER TESLA", "TRANSENER Costeo Emplazamiento", "TRANSENER Mantenimiento"],
-    "SACDE":         ["SACDE - Francos", "SACDE - Equipos", "SACDE - Partes Diarios",
-                      "SACDE APP MATERIALES", "SACDE Mantenimiento", "SACDE PORTAL"],
-    "Bayer":         ["Bayer"],
-    "Pampa Energia": ["PAMPA Almacenes Mejoras"],
-}
-JIRA_TO_CLIENT = {p: cl for cl, ps in CLIENT_JIRA_MAP.items() for p in ps}
-
-CW_TO_JIRA = {
-    "Tesla":                               "TRANSENER TESLA",
-    "Costeo de Emplazamiento":             "TRANSENER Costeo Emplazamiento",
-    "Migración S4":                        "TRANSENER Mantenimiento",
-    "Interface de Francos Compensatorios": "TRANSENER Mantenimiento",
-    "Trello":                              "TRANSENER Mantenimiento",
-    "Premios":                             "TRANSENER Mantenimiento",
-    "Paquete 4 ''Francos APK''":           "SACDE - Francos",
-    "Portal de Proveedores FASE 1":        "SACDE PORTAL",
-    "Portal de Proveedores FASE 2":        "SACDE PORTAL",
-    "Auditoria Seguridad":                 "SACDE Mantenimiento",
-    "Soporte":                             "SACDE Mantenimiento",
-    "Consultoria FICO":                    "SACDE Mantenimiento",
-    "App Facilites":                       "Bayer",
-    "Mejoras Solped":                      "Bayer",
-    "Mejoras App Almacenes- Fase 2":       "PAMPA Almacenes Mejoras",
-}
+try:
+    import brotli           # opcional: pip install brotli
+except ImportError:
+    brotli = None
 
-CLIENT_COLORS = {
-    "Transener":    "#6366f1",
-    "SACDE":        "#f59e0b",
-    "Bayer":        "#3b82f6",
-    "Pampa Energia":"#10b981",
-}
+PORT             = 8765
+SERVER_WORKERS   = 16    # conexiones atendidas en paralelo ("server_workers")
+KEEPALIVE_SECS   = 2     # una conexión keep-alive ociosa libera su worker después de esto
+REQUEST_TIMEOUT  = 30    # leyendo o escribiendo un request ya empezado
+SSE_PING_SECS    = 15    # comentario de keep-alive en /api/stream
+SSE_MAX_BUFFER   = 1024 * 1024   # un cliente SSE que no lee y acumula más que esto se corta
+SSE_MAX_TAREAS   = 500   # ids de tareas por evento; más que eso se marca "truncado"
+DELTA_HISTORY    = 50    # versiones hacia atrás que /api/data?since= puede contestar con un delta
+MAPEOS_POLL_SECS = 2     # cada cuánto se mira si cambió mapeos.json
+COMPRESS_MIN     = 1024  # bytes; respuestas más chicas van sin comprimir
+STATIC_ROOT      = "."   # se sirve el directorio desde donde se lanza, como hasta ahora
+STATIC_CACHE_MAX = 2 * 1024 * 1024   # archivos más grandes no se cachean: van por sendfile
+CONFIG_FILE      = "config.json"
+REFRESH_INTERVAL = 300   # segundos entre refrescos ("refresh_interval" en config.json)
+REFRESH_MIN      = 10    # piso de refresh_interval: con 0 o negativo el scheduler giraría sin pausa
+JIRA_STORE_FILE  = "jira_store.json"
+JIRA_FULL_SYNC_H = 24    # cada cuántas horas se buscan issues borradas ("jira_full_sync_hours")
+JIRA_SYNC_MARGIN = 10    # minutos de solapamiento entre syncs incrementales
+CLOCKIFY_CACHE   = "clockify_cache"
+HISTORY_FILE     = "historial.jsonl"   # un snapshot de KPIs por refresh con cambios ("history_file", "" = no guardar)
+CLOCKIFY_LOOKBACK = 7    # días que se vuelven a bajar por ediciones tardías ("clockify_lookback_days")
+HTTP_CONCURRENCY = 4     # páginas en paralelo por fuente ("http_concurrency")
+HTTP_RETRIES     = 5     # reintentos ante 429/503
+SOURCE_TIMEOUT   = 120   # segundos por sitio/workspace antes de usar sus datos anteriores ("source_timeout")
+CLOCKIFY_API     = "https://api.clockify.me/api/v1"         # "clockify_api_url"
+CLOCKIFY_REPORTS = "https://reports.api.clockify.me/v1"     # "clockify_reports_url"
 
-ESTADOS_DONE = {
-    "finalizada", "cerrado", "resuelto", "done", "closed", "resolved",
-    "completado", "completada", "terminado", "terminada", "entrega",
-}
+def json_default(o):
+    """Las tareas viajan como objetos hasta acá; recién al serializar se vuelven dicts."""
+    return o.as_api_dict() if isinstance(o, Tarea) else str(o)
 
 # ── CONFIG ────────────────────────────────────────────────────────
 def load_config():
@@ -81,202 +96,528 @@ def save_config(cfg):
 def secs_to_hours(s):
     return round(s / 3600, 2) if s else None
 
-def parse_iso_duration(s):
-    """PT1H30M15S → float horas"""
-    if not s or not s.startswith("PT"):
-        return 0.0
-    h   = int(re.search(r"(\d+)H", s).group(1)) if "H" in s else 0
-    m   = int(re.search(r"(\d+)M", s).group(1)) if "M" in s else 0
-    sec = int(re.search(r"(\d+)S", s).group(1)) if "S" in s else 0
-    return h + m / 60 + sec / 3600
+# ── HTTP: SESIÓN COMPARTIDA + BACKOFF ────────────────────────────
+_session      = requests.Session()
+_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32))
+_session.mount("http://",  requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32))
+_backoff_lock  = threading.Lock()
+_backoff_until = 0.0
+
+def http_request(method, url, **kw):
+    """requests vía la sesión compartida; ante 429/503 respeta Retry-After y
+    frena a todos los workers hasta que venza."""
+    global _backoff_until
+    for attempt in range(HTTP_RETRIES + 1):
+        wait = _backoff_until - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        t0   = time.perf_counter()
+        r    = _session.request(method, url, **kw)
+        host = urlparse(url).netloc
+        METRICS.observe("http_client_seconds", time.perf_counter() - t0, host=host)
+        METRICS.inc("http_client_requests_total", host=host, status=str(r.status_code))
+        METRICS.inc("http_client_bytes_total", len(r.content), host=host)
+        if r.status_code not in (429, 503) or attempt == HTTP_RETRIES:
+            r.raise_for_status()
+            return r
+        try:
+            delay = float(r.headers.get("Retry-After", ""))
+        except ValueError:
+            delay = 2 ** attempt
+        with _backoff_lock:
+            _backoff_until = max(_backoff_until, time.monotonic() + delay)
+        print(f"  HTTP {r.status_code} en {url}, reintento en {delay:.0f}s")
+
+def fetch_pages(cfg, first_page, page_fn, n_pages):
+    """Baja las páginas 1..n_pages-1 en paralelo (la 0 ya vino) y las devuelve en orden."""
+    workers = max(1, int(cfg.get("http_concurrency", HTTP_CONCURRENCY)))
+    if n_pages <= 1 or workers == 1:
+        return [first_page] + [page_fn(i) for i in range(1, n_pages)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [first_page] + list(pool.map(page_fn, range(1, n_pages)))
 
 def build_default_jql():
-    projs = '","'.join(p for ps in CLIENT_JIRA_MAP.values() for p in ps)
+    # Ordenada: mover un proyecto de cliente en mapeos.json no cambia la JQL (ni invalida el store)
+    projs = '","'.join(sorted(p for ps in CLIENT_JIRA_MAP.values() for p in ps))
     return f'project in ("{projs}") ORDER BY created DESC'
 
 # ── JIRA API ─────────────────────────────────────────────────────
-def fetch_jira(cfg):
+JIRA_FIELDS = ("summary,status,assignee,duedate,resolutiondate,"
+               "timeoriginalestimate,timeestimate,timespent,project")
+
+def _jira_search(cfg, jql, fields):
     domain = cfg["jira_domain"].strip().rstrip("/")
     token  = base64.b64encode(f"{cfg['jira_email']}:{cfg['jira_token']}".encode()).decode()
     hdrs   = {"Authorization": f"Basic {token}", "Accept": "application/json"}
-    jql    = cfg.get("jira_jql") or build_default_jql()
-    url    = f"https://{domain}/rest/api/3/search"
-    fields = ("summary,status,assignee,duedate,resolutiondate,"
-              "timeoriginalestimate,timeestimate,timespent,project")
+    base   = domain if domain.startswith(("http://", "https://")) else f"https://{domain}"
+    url    = f"{base}/rest/api/3/search"
 
-    issues, start = [], 0
-    while True:
-        r = requests.get(url, headers=hdrs, params={
+    def page(start):
+        d = http_request("GET", url, headers=hdrs, params={
             "jql": jql, "fields": fields, "maxResults": 100, "startAt": start
-        }, timeout=30)
-        r.raise_for_status()
-        d = r.json()
-        batch = d.get("issues", [])
-        issues += batch
-        start  += len(batch)
-        if start >= d.get("total", 0) or not batch:
-            break
+        }, timeout=30).json()
+        METRICS.inc("source_pages_total", fuente="jira")
+        METRICS.inc("source_records_total", len(d.get("issues", [])), fuente="jira")
+        return d
 
+    # La primera página trae el total; Jira puede limitar maxResults, así que el
+    # tamaño real de página sale de lo que devolvió
+    first = page(0)
+    size  = len(first.get("issues", []))
+    total = first.get("total", 0)
+    if not size or size >= total:
+        return first.get("issues", [])
+
+    n_pages = -(-total // size)
+    pages   = fetch_pages(cfg, first, lambda i: page(i * size), n_pages)
+    return [issue for d in pages for issue in d.get("issues", [])]
+
+def fetch_jira(cfg):
+    if cfg.get("jira_incremental", True):
+        return sync_jira(cfg)
+    issues = _jira_search(cfg, cfg.get("jira_jql") or build_default_jql(), JIRA_FIELDS)
     print(f"  Jira: {len(issues)} issues obtenidas")
     return issues
 
-def process_jira(issues):
-    by_client = {}
-    today     = datetime.utcnow().date()
+# ── JIRA: SYNC INCREMENTAL ───────────────────────────────────────
+_jira_store_locks = {}   # archivo de store → lock (un sync por sitio a la vez)
 
-    for issue in issues:
-        f   = issue["fields"]
-        prj = f["project"]["name"]
-        cl  = JIRA_TO_CLIENT.get(prj)
-        if not cl:
-            continue
+def strip_order_by(jql):
+    return re.sub(r"\s+ORDER\s+BY\s+.*$", "", jql, flags=re.I | re.S).strip()
 
-        est  = secs_to_hours(f.get("timeoriginalestimate") or 0) or None
-        pend = secs_to_hours(f.get("timeestimate")          or 0) or None
-        cons = secs_to_hours(f.get("timespent")             or 0) or None
-        if cons is None and est is not None and pend is not None:
-            cons = round(est - pend, 2)
+def load_jira_store(path, source):
+    """Store local {key: issue}; se descarta si cambió el sitio o la JQL."""
+    if os.path.exists(path):
+        with open(path) as f:
+            store = json.load(f)
+        if store.get("source") == source:
+            return store
+    return {"source": source, "last_sync": None, "last_full": None, "issues": {}}
 
-        ffin   = (f.get("duedate")         or "")[:10] or None
-        ffreal = (f.get("resolutiondate")  or "")[:10] or None
+def save_jira_store(path, store):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(store, f, ensure_ascii=False)
+    os.replace(tmp, path)
 
-        estado  = (f["status"]["name"] or "").lower()
-        is_done = estado in ESTADOS_DONE
+def sync_jira(cfg):
+    """Trae solo las issues actualizadas desde el último sync y las fusiona con el store.
 
-        # Semáforo fecha
-        if not ffin:
-            sf = "gris"
-        elif is_done:
-            if not ffreal:
-                sf = "verde"
-            else:
-                diff = (datetime.fromisoformat(ffreal) - datetime.fromisoformat(ffin)).days
-                sf   = "verde" if diff <= 0 else "rojo"
-        else:
-            rest = (datetime.fromisoformat(ffin).date() - today).days
-            sf   = "rojo" if rest < 0 else ("amarillo" if rest <= 7 else "verde")
-
-        # Semáforo horas
-        if est is None or cons is None:
-            sh = "gris"
-        elif cons > est:
-            sh = "rojo"
-        elif not is_done and est > 0 and cons / est >= 0.8:
-            sh = "amarillo"
+    Cada `jira_full_sync_hours` se listan todas las claves que matchean la JQL para
+    eliminar del store las issues borradas o que dejaron de matchear.
+    """
+    base   = strip_order_by(cfg.get("jira_jql") or build_default_jql())
+    source = f"{cfg['jira_domain'].strip().rstrip('/')}|{base}"
+    path   = cfg.get("jira_store_file", JIRA_STORE_FILE)
+
+    with _jira_store_locks.setdefault(path, threading.Lock()):
+        store   = load_jira_store(path, source)
+        started = datetime.now()
+        issues  = store["issues"]
+
+        if store["last_sync"] is None:
+            batch = _jira_search(cfg, base, JIRA_FIELDS)
+            issues.clear()
+            store["last_full"] = started.isoformat()
+            print(f"  Jira: sync completo, {len(batch)} issues")
         else:
-            sh = "verde"
-
-        desvio = None
-        if ffin and ffreal:
-            desvio = (datetime.fromisoformat(ffreal) - datetime.fromisoformat(ffin)).days
-
-        assignee = f.get("assignee")
-        task = {
-            "id":               issue["key"],
-            "resumen":          f.get("summary", ""),
-            "estado":           f["status"]["name"],
-            "persona":          assignee["displayName"] if assignee else "Sin asignar",
-            "horas_estimadas":  est,
-            "horas_consumidas": cons,
-            "horas_pendientes": pend,
-            "fecha_fin":        ffin,      # YYYY-MM-DD string (frontend convertirá a Date)
-            "fecha_fin_real":   ffreal,
-            "desvio_dias":      desvio,
-            "sem_fecha":        sf,
-            "sem_horas":        sh,
-        }
-        by_client.setdefault(cl, {}).setdefault(prj, []).append(task)
+            # Ventana relativa ("-Nm"): evita depender de la zona horaria del usuario de Jira
+            mins  = int((started - datetime.fromisoformat(store["last_sync"])).total_seconds() // 60)
+            jql   = f'({base}) AND updated >= "-{mins + JIRA_SYNC_MARGIN}m"'
+            batch = _jira_search(cfg, jql, JIRA_FIELDS)
+            print(f"  Jira: sync incremental, {len(batch)} issues actualizadas")
 
-    return by_client
+        for issue in batch:
+            issues[issue["key"]] = {"key": issue["key"], "fields": issue["fields"]}
 
-# ── CLOCKIFY API ─────────────────────────────────────────────────
-def fetch_clockify(cfg):
-    key       = cfg["clockify_key"]
-    hdrs_base = {"X-Api-Key": key}
-    hdrs_json = {**hdrs_base, "Content-Type": "application/json"}
-
-    # Obtener workspace
-    wid = cfg.get("clockify_workspace")
-    if not wid:
-        r = requests.get("https://api.clockify.me/api/v1/workspaces", headers=hdrs_base, timeout=15)
-        r.raise_for_status()
-        ws = r.json()
-        if not ws:
-            raise ValueError("No se encontraron workspaces en Clockify")
-        wid = ws[0]["id"]
-        cfg["clockify_workspace"] = wid
-        save_config(cfg)
-        print(f"  Clockify workspace: {ws[0].get('name','?')} ({wid})")
+        full_every = cfg.get("jira_full_sync_hours", JIRA_FULL_SYNC_H) * 3600
+        last_full  = datetime.fromisoformat(store["last_full"])
+        if (started - last_full).total_seconds() >= full_every:
+            alive   = {i["key"] for i in _jira_search(cfg, base, "key")}
+            deleted = [k for k in issues if k not in alive]
+            for k in deleted:
+                del issues[k]
+            store["last_full"] = started.isoformat()
+            print(f"  Jira: {len(deleted)} issues eliminadas del store")
 
-    date_from = cfg.get("clockify_date_from", f"{datetime.now().year}-01-01T00:00:00.000Z")
-    date_to   = datetime.utcnow().strftime("%Y-%m-%dT23:59:59.999Z")
+        store["last_sync"] = started.isoformat()
+        save_jira_store(path, store)
 
-    by_proj   = {}
-    by_client = {}
-    total_entries = 0
-    page      = 1
+    print(f"  Jira: {len(issues)} issues en store ({cfg['jira_domain']})")
+    return list(issues.values())
 
-    while True:
+def process_jira(issues, agg, prefijo=""):
+    """Issues de un sitio → agg; `prefijo` distingue las claves de los sitios extra."""
+    today = datetime.utcnow().date()
+    for issue in issues:
+        t = tarea_jira(issue, prefijo, today)
+        if t:
+            agg.upsert(*t)
+    return agg
+
+def tarea_jira(issue, prefijo, today):
+    """(cliente, proyecto, Tarea) de una issue, o None si su proyecto no tiene cliente."""
+    f   = issue["fields"]
+    prj = f["project"]["name"]
+    cl  = JIRA_TO_CLIENT.get(prj)
+    if not cl:
+        return None
+
+    est  = secs_to_hours(f.get("timeoriginalestimate") or 0) or None
+    pend = secs_to_hours(f.get("timeestimate")          or 0) or None
+    cons = horas_consumidas(secs_to_hours(f.get("timespent") or 0) or None, est, pend)
+
+    ffin   = (f.get("duedate")         or "")[:10] or None
+    ffreal = (f.get("resolutiondate")  or "")[:10] or None
+    dfin   = iso_date(ffin)   if ffin   else None
+    dreal  = iso_date(ffreal) if ffreal else None
+
+    estado  = f["status"]["name"] or ""
+    is_done = estado.lower() in ESTADOS_DONE
+
+    assignee = f.get("assignee")
+    return cl, prj, Tarea(
+        id               = prefijo + issue["key"],
+        resumen          = f.get("summary", ""),
+        estado           = estado,
+        persona          = assignee["displayName"] if assignee else "Sin asignar",
+        horas_estimadas  = est,
+        horas_consumidas = cons,
+        horas_pendientes = pend,
+        fecha_fin        = ffin,      # YYYY-MM-DD string (frontend convertirá a Date)
+        fecha_fin_real   = ffreal,
+        desvio_dias      = (dreal - dfin).days if dfin and dreal else None,
+        sem_fecha        = semaforo_fecha(dfin, dreal, is_done, today),
+        sem_horas        = semaforo_horas(est, cons, is_done),
+        es_finalizado    = is_done,
+    )
+
+# ── CLOCKIFY API ─────────────────────────────────────────────────
+def _clockify_workspaces(cfg):
+    """Todos los workspaces de la API key; se guardan en "clockify_workspaces"
+    para no volver a listarlos en cada refresh."""
+    r = http_request("GET", f"{cfg.get('clockify_api_url', CLOCKIFY_API)}/workspaces",
+                     headers={"X-Api-Key": cfg["clockify_key"]}, timeout=15)
+    ws = r.json()
+    if not ws:
+        raise ValueError("No se encontraron workspaces en Clockify")
+    cfg["clockify_workspaces"] = [w["id"] for w in ws]
+    save_config(cfg)
+    for w in ws:
+        print(f"  Clockify workspace: {w.get('name','?')} ({w['id']})")
+    return cfg["clockify_workspaces"]
+
+def _clockify_report(cfg, wid, date_from, date_to):
+    hdrs = {"X-Api-Key": cfg["clockify_key"], "Content-Type": "application/json"}
+    url  = f"{cfg.get('clockify_reports_url', CLOCKIFY_REPORTS)}/workspaces/{wid}/reports/detailed"
+
+    def page(n):
         body = {
             "dateRangeStart": date_from,
             "dateRangeEnd":   date_to,
-            "detailedFilter": {"page": page, "pageSize": 1000, "sortColumn": "DATE"},
+            "detailedFilter": {"page": n, "pageSize": 1000, "sortColumn": "DATE"},
         }
-        r = requests.post(
-            f"https://reports.api.clockify.me/v1/workspaces/{wid}/reports/detailed",
-            headers=hdrs_json,
-            json=body,
-            timeout=30,
-        )
-        r.raise_for_status()
-        d = r.json()
+        d = http_request("POST", url, headers=hdrs, json=body, timeout=30).json()
+        METRICS.inc("source_pages_total", fuente="clockify")
+        METRICS.inc("source_records_total", len(d.get("timeentries", [])), fuente="clockify")
+        return d
+
+    first       = page(1)
+    total_count = (first.get("totals") or [{}])[0].get("entriesCount", 0)
+    n_pages     = max(1, -(-total_count // 1000)) if first.get("timeentries") else 1
+    pages       = fetch_pages(cfg, first, lambda i: page(i + 1), n_pages)
+    return [e for d in pages for e in d.get("timeentries", [])]
+
+def fetch_clockify_entries(cfg):
+    """Entradas de un workspace (un cfg de clockify_sources)."""
+    wid       = cfg["clockify_workspace"]
+    date_from = cfg.get("clockify_date_from", f"{datetime.now().year}-01-01T00:00:00.000Z")
+    if cfg.get("clockify_incremental", True):
+        entries = sync_clockify(cfg, wid, date_from)
+    else:
+        date_to = datetime.utcnow().strftime("%Y-%m-%dT23:59:59.999Z")
+        entries = _clockify_report(cfg, wid, date_from, date_to)
+    print(f"  Clockify: {len(entries)} entradas ({wid})")
+    return entries
+
+def fetch_clockify(cfg, agg, entradas=None):
+    """Baja y procesa los workspaces uno tras otro (fetch_all los baja en paralelo)."""
+    for src in clockify_sources(cfg):
+        with METRICS.etapa("fetch_clockify", fuente=src["clockify_workspace"]):
+            entries = fetch_clockify_entries(src)
+        with METRICS.etapa("process_clockify"):
+            process_clockify(entries, agg, entradas)
+    return agg
+
+def process_clockify(entries, agg, entradas=None):
+    duraciones = parse_iso_durations([e.get("timeInterval", {}).get("duration", "PT0S") for e in entries])
+    for e, horas in zip(entries, duraciones):
+        proj, user, horas, fila = entrada_clockify(e, horas)
+        agg.add_time(proj, user, horas)
+        if entradas is not None:
+            entradas.append(fila)
+    return agg
+
+def entrada_clockify(e, horas=None):
+    """(proyecto, usuario, horas, fila de time_entries) de una entrada de Clockify;
+    `horas` evita reconvertir la duración si ya vino de parse_iso_durations."""
+    proj, user = e.get("projectName", ""), e.get("userName", "")
+    ti         = e.get("timeInterval", {})
+    if horas is None:
+        horas = parse_iso_duration(ti.get("duration", "PT0S"))
+    return proj, user, horas, entrada(e.get("id") or e.get("_id") or f"{proj}|{user}|{ti.get('start')}",
+                                      proj, user, (ti.get("start") or "")[:10] or None, horas)
+
+# ── CLOCKIFY: CACHE PARTICIONADO POR SEMANA ──────────────────────
+_clockify_cache_locks = {}   # carpeta del workspace → lock
+
+def _entry_day(e):
+    """Día UTC del inicio de la entrada ("" si no tiene): la ventana que se le pide
+    a Clockify se corta en UTC, así que las semanas y el corte también."""
+    start = e.get("timeInterval", {}).get("start") or ""
+    try:
+        dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    except ValueError:
+        return start[:10]
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc)
+    return dt.date().isoformat()
+
+def _week_start(day):
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+def _read_json(path, default):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return default
 
-        for e in d.get("timeentries", []):
-            cw_proj   = e.get("projectName", "")
-            user      = e.get("userName", "")
-            dur_h     = parse_iso_duration(e.get("timeInterval", {}).get("duration", "PT0S"))
-            jira_proj = CW_TO_JIRA.get(cw_proj)
-            jira_cl   = JIRA_TO_CLIENT.get(jira_proj) if jira_proj else None
+def _write_json(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp, path)
 
-            if jira_proj:
-                d2 = by_proj.setdefault(jira_proj, {"total": 0, "users": {}})
-                d2["total"]      += dur_h
-                d2["users"][user] = d2["users"].get(user, 0) + dur_h
+def sync_clockify(cfg, wid, date_from):
+    """Mantiene las entradas en un archivo por semana (clockify_cache/<wid>/<lunes>.json).
 
-            if jira_cl:
-                by_client.setdefault(jira_cl, {"total": 0})["total"] += dur_h
+    Los días anteriores a hoy - `clockify_lookback_days` quedan cerrados y no se vuelven
+    a pedir; solo se baja la ventana abierta y se reescriben las semanas que toca.
+    """
+    folder   = os.path.join(CLOCKIFY_CACHE, wid)
+    lookback = cfg.get("clockify_lookback_days", CLOCKIFY_LOOKBACK)
+    first    = date.fromisoformat(date_from[:10])
+    today    = datetime.utcnow().date()
 
-            total_entries += 1
+    with _clockify_cache_locks.setdefault(folder, threading.Lock()):
+        os.makedirs(folder, exist_ok=True)
+        meta_path = os.path.join(folder, "_meta.json")
+        meta      = _read_json(meta_path, {})
+        if meta.get("date_from") != date_from:
+            for fn in os.listdir(folder):
+                os.remove(os.path.join(folder, fn))
+            meta = {"date_from": date_from, "closed_through": None}
 
-        total_count = (d.get("totals") or [{}])[0].get("entriesCount", 0)
-        if page * 1000 >= total_count or not d.get("timeentries"):
-            break
-        page += 1
+        closed = meta["closed_through"]
+        start  = date.fromisoformat(closed) + timedelta(days=1) if closed else first
+        fresh  = _clockify_report(cfg, wid, f"{start.isoformat()}T00:00:00.000Z",
+                                  today.strftime("%Y-%m-%dT23:59:59.999Z"))
+
+        by_week = {}
+        for e in fresh:
+            compact = {
+                "id":           e.get("id") or e.get("_id"),
+                "projectName":  e.get("projectName", ""),
+                "userName":     e.get("userName", ""),
+                "timeInterval": {"start":    e.get("timeInterval", {}).get("start"),
+                                 "duration": e.get("timeInterval", {}).get("duration", "PT0S")},
+            }
+            day = _entry_day(compact)
+            if day:
+                by_week.setdefault(_week_start(date.fromisoformat(day)), []).append(compact)
+
+        # Reescribir las semanas de la ventana: lo anterior a `start` ya estaba cerrado
+        # (y lo que volvió a venir, por id, se reemplaza aunque un cache viejo lo tenga en otro día)
+        fresh_ids = {e["id"] for week in by_week.values() for e in week if e["id"]}
+        wk = date.fromisoformat(_week_start(start))
+        while wk <= today:
+            path = os.path.join(folder, f"{wk.isoformat()}.json")
+            kept = [e for e in _read_json(path, [])
+                    if _entry_day(e) < start.isoformat() and e.get("id") not in fresh_ids]
+            _write_json(path, kept + by_week.get(wk.isoformat(), []))
+            wk  += timedelta(days=7)
+
+        new_closed = max(start - timedelta(days=1), today - timedelta(days=lookback))
+        meta["closed_through"] = new_closed.isoformat()
+        _write_json(meta_path, meta)
+
+        # Una entrada cuenta una vez aunque un cache armado con días locales la
+        # tenga en dos semanas: gana la de la semana más reciente
+        entries, by_id = [], {}
+        for fn in sorted(os.listdir(folder)):
+            if fn[0].isdigit() and fn.endswith(".json"):
+                for e in _read_json(os.path.join(folder, fn), []):
+                    if e.get("id"):
+                        by_id[e["id"]] = e
+                    else:
+                        entries.append(e)
+        entries += by_id.values()
+
+    print(f"  Clockify: {len(fresh)} entradas bajadas desde {start.isoformat()} ({wid})")
+    return entries
+
+# ── FUENTES: VARIOS SITIOS DE JIRA Y WORKSPACES DE CLOCKIFY ──────
+_last_fetch   = {}   # "jira:<dominio>" / "clockify:<workspace>" → (generación, lo último que se bajó)
+_inflight     = {}   # misma clave → Future de la descarga en curso (a lo sumo una por fuente)
+_fetch_lock   = threading.Lock()
+_fetch_gen    = 0    # sube en cada fetch_sources
+
+def _host(domain):
+    return domain.split("://")[-1].strip().strip("/").lower()
+
+def jira_sources(cfg):
+    """Un cfg por sitio de Jira: el de "jira_domain" y los de "jira_sites" (un dominio
+    repetido se baja una sola vez).
+
+    Cada sitio de la lista es {"domain", "email", "token", "jql", "timeout", "prefix"};
+    lo que falte se toma del nivel de arriba. El sitio principal sigue usando
+    jira_store.json y claves tal cual; los demás usan jira_store.<dominio>.json y
+    sus claves llevan "<prefix>:" (por defecto el subdominio, "otra:OPS-1"), así
+    dos sitios con un OPS-1 no se pisan en el agregador, el índice ni SQLite.
+    """
+    out, hosts, prefixes = [], set(), {""}
+    if cfg.get("jira_domain") and cfg.get("jira_token"):
+        out.append(dict(cfg, jira_prefix=""))
+        hosts.add(_host(cfg["jira_domain"]))
+    for site in cfg.get("jira_sites", []):
+        src = dict(cfg, jira_domain=site.get("domain", ""),
+                   jira_email=site.get("email", cfg.get("jira_email", "")),
+                   jira_token=site.get("token", cfg.get("jira_token", "")),
+                   jira_jql=site.get("jql", cfg.get("jira_jql", "")))
+        if "timeout" in site:
+            src["source_timeout"] = site["timeout"]
+        host = _host(src["jira_domain"])
+        if not host or not src["jira_token"] or host in hosts:
+            continue
+        slug   = re.sub(r"[^\w.-]+", "_", host)
+        prefix = site.get("prefix") or re.split(r"[.:]", host)[0]
+        if prefix in prefixes:      # dos sitios con el mismo subdominio: el host entero
+            prefix = slug
+        hosts.add(host)
+        prefixes.add(prefix)
+        src["jira_store_file"] = f"{os.path.splitext(JIRA_STORE_FILE)[0]}.{slug}.json"
+        src["jira_prefix"]     = prefix + ":"
+        out.append(src)
+    return out
+
+def clockify_sources(cfg):
+    """Un cfg por workspace de Clockify.
+
+    "clockify_workspaces" es una lista de ids o de {"id", "key", "date_from", "timeout"}
+    (lo que falte sale del nivel de arriba); si no está se usa "clockify_workspace",
+    y si tampoco, todos los workspaces de la API key.
+    """
+    items = cfg.get("clockify_workspaces") or [w for w in [cfg.get("clockify_workspace")] if w]
+    if not items and cfg.get("clockify_key"):
+        items = _clockify_workspaces(cfg)
+    out, vistos = [], set()
+    for w in items:
+        w   = {"id": w} if isinstance(w, str) else w
+        if w.get("id") in vistos:
+            continue
+        vistos.add(w.get("id"))
+        src = dict(cfg, clockify_workspace=w.get("id", ""),
+                   clockify_key=w.get("key", cfg.get("clockify_key", "")))
+        for k_src, k_cfg in (("date_from", "clockify_date_from"), ("timeout", "source_timeout")):
+            if k_src in w:
+                src[k_cfg] = w[k_src]
+        if src["clockify_workspace"] and src["clockify_key"]:
+            out.append(src)
+    return out
 
-    print(f"  Clockify: {total_entries} entradas procesadas")
-    return by_proj, by_client
+def _fetch_source(tipo, nombre, fn, src, gen):
+    with METRICS.etapa(f"fetch_{tipo}", fuente=nombre):
+        data = fn(src)
+    # Aunque llegue tarde (después del timeout) queda para el próximo refresh,
+    # salvo que ya haya algo de una generación posterior
+    key = f"{tipo}:{nombre}"
+    with _fetch_lock:
+        if key not in _last_fetch or _last_fetch[key][0] <= gen:
+            _last_fetch[key] = (gen, data)
+    return data
+
+def _launch(key, args):
+    """Future de la descarga de una fuente. Si la anterior todavía no terminó (se
+    pasó del timeout) se espera esa misma en vez de lanzar otra: una fuente colgada
+    ocupa un solo hilo, y es daemon para no demorar la salida con Ctrl-C."""
+    with _fetch_lock:
+        fut = _inflight.get(key)
+        if fut is not None and not fut.done():
+            return fut
+        fut = _inflight[key] = Future()
+
+    def run():
+        try:
+            fut.set_result(_fetch_source(*args))
+        except BaseException as e:
+            fut.set_exception(e)
+    threading.Thread(target=run, name=f"fuente-{key}", daemon=True).start()
+    return fut
+
+def fetch_sources(cfg):
+    """Baja todos los sitios y workspaces a la vez; devuelve [(tipo, nombre, datos, prefijo)]
+    (prefijo: el de las claves de Jira del sitio, "" en Clockify).
+
+    Cada fuente tiene "source_timeout" segundos (o su "timeout"): si no llega a tiempo
+    o falla se usa lo que se bajó de ella antes, así el refresh tarda lo que la
+    fuente más lenta y no la suma. Una fuente que nunca respondió hace fallar el
+    refresh. Con "source_concurrency": 1 se bajan en serie y sin timeout.
+    """
+    global _fetch_gen
+    with _fetch_lock:
+        _fetch_gen += 1
+        gen = _fetch_gen
+    fuentes = ([("jira", s["jira_domain"], fetch_jira, s) for s in jira_sources(cfg)] +
+               [("clockify", s["clockify_workspace"], fetch_clockify_entries, s)
+                for s in clockify_sources(cfg)])
+    if int(cfg.get("source_concurrency", 0)) == 1:
+        return [(tipo, nombre, _fetch_source(tipo, nombre, fn, src, gen), src.get("jira_prefix", ""))
+                for tipo, nombre, fn, src in fuentes]
+
+    started = time.monotonic()
+    futs    = [_launch(f"{tipo}:{nombre}", (tipo, nombre, fn, src, gen))
+               for tipo, nombre, fn, src in fuentes]
+
+    out = []
+    for (tipo, nombre, _, src), fut in zip(fuentes, futs):
+        key   = f"{tipo}:{nombre}"
+        limit = started + src.get("source_timeout", SOURCE_TIMEOUT)
+        try:
+            data = fut.result(timeout=max(0, limit - time.monotonic()))
+        except Exception as e:
+            motivo = "timeout" if isinstance(e, FuturesTimeout) else "error"
+            METRICS.inc("source_failures_total", fuente=key, motivo=motivo)
+            with _fetch_lock:
+                prev = _last_fetch.get(key)
+            if prev is None:
+                raise RuntimeError(f"{key}: {'sin respuesta a tiempo' if motivo == 'timeout' else e}") from e
+            print(f"  ⚠️  {key}: {motivo if motivo == 'timeout' else e}; se usan los datos anteriores")
+            data = prev[1]
+        out.append((tipo, nombre, data, src.get("jira_prefix", "")))
+    return out
 
 # ── BUILD DASHBOARD DATA ─────────────────────────────────────────
-def build_data(jira_by_client, cw_by_proj, cw_by_client):
-    all_cl = sorted(set(list(jira_by_client) + list(cw_by_client)))
+def build_data(agg):
+    all_cl = sorted(set(agg.clientes()) | set(agg.cw_client))
     clients = []
 
     for cl_name in all_cl:
-        projects = jira_by_client.get(cl_name, {})
-        color    = CLIENT_COLORS.get(cl_name, "#667eea")
+        projects  = agg.projects.get(cl_name, {})
         proj_list = []
-        total_est = total_cons = total_pend = total_tasks = 0
 
         for proj_name in sorted(projects):
-            tareas = projects[proj_name]
-            cw     = cw_by_proj.get(proj_name, {"total": 0, "users": {}})
-
-            p_est  = sum(t["horas_estimadas"]  or 0 for t in tareas)
-            p_cons = sum(t["horas_consumidas"] or 0 for t in tareas)
-            p_pend = sum(t["horas_pendientes"] or 0 for t in tareas)
-
-            total_est  += p_est;  total_cons += p_cons
-            total_pend += p_pend; total_tasks += len(tareas)
+            tareas, p_est, p_cons, p_pend = agg.proyecto(cl_name, proj_name)
+            cw = agg.clockify_proyecto(proj_name)
 
             cw_users = sorted(
                 [{"nombre": n, "horas": round(h, 1)} for n, h in cw["users"].items()],
@@ -284,7 +625,7 @@ def build_data(jira_by_client, cw_by_proj, cw_by_client):
             )
 
             def sort_key(t):
-                return (t["horas_estimadas"] is None, t["fecha_fin"] is None, t["fecha_fin"] or "9999")
+                return (t.horas_estimadas is None, t.fecha_fin is None, t.fecha_fin or "9999")
 
             proj_list.append({
                 "nombre":                proj_name,
@@ -296,14 +637,15 @@ def build_data(jira_by_client, cw_by_proj, cw_by_client):
                 "tareas":                sorted(tareas, key=sort_key),
             })
 
+        total_est, total_cons, total_pend, total_tasks = agg.cliente(cl_name)
         clients.append({
             "nombre":    cl_name,
-            "color":     color,
+            "color":     CLIENT_COLORS.get(cl_name, DEFAULT_COLOR),
             "kpis": {
                 "horas_estimadas":  round(total_est,  1),
                 "horas_consumidas": round(total_cons, 1),
                 "horas_pendientes": round(total_pend, 1),
-                "horas_clockify":   round(cw_by_client.get(cl_name, {}).get("total", 0), 1),
+                "horas_clockify":   round(agg.clockify_cliente(cl_name), 1),
                 "total_tareas":     total_tasks,
                 "total_proyectos":  len(projects),
             },
@@ -313,19 +655,757 @@ def build_data(jira_by_client, cw_by_proj, cw_by_client):
     return clients
 
 def fetch_all(cfg):
-    jira_by_cl = {}
-    if cfg.get("jira_domain") and cfg.get("jira_token"):
-        print("Conectando con Jira...")
-        issues     = fetch_jira(cfg)
-        jira_by_cl = process_jira(issues)
+    """Baja todas las fuentes y arma el dataset; devuelve (clients, fuentes crudas)."""
+    print("Conectando con Jira y Clockify...")
+    with METRICS.etapa("fetch"):
+        fuentes = fetch_sources(cfg)
+    return armar(cfg, fuentes), fuentes
+
+class Incremental:
+    """El Agregador que sigue vivo entre refreshes.
+
+    aplicar() compara lo bajado con lo que ya se le aplicó y solo da de alta,
+    actualiza o da de baja las issues y entradas que cambiaron: los totales de
+    proyectos y clientes se ajustan en O(1) por cambio. Con otros mapeos o en otro
+    día (el semáforo de fecha depende de hoy) se vuelve a armar desde cero.
+    """
+
+    def __init__(self):
+        self.reset(None)
+
+    def reset(self, clave):
+        self.clave   = clave
+        self.agg     = Agregador()
+        self.issues  = {}   # id de tarea → issue cruda ya aplicada
+        self.entries = {}   # (workspace, id) → (entrada cruda, proyecto, usuario, horas, fila)
+
+    def aplicar(self, fuentes):
+        """Lleva el agregador a `fuentes`; devuelve (agg, cambios de Jira, cambios de Clockify)."""
+        today = datetime.utcnow().date()
+        if self.clave != (today, mapeos.GENERACION):
+            self.reset((today, mapeos.GENERACION))
+        try:
+            with METRICS.etapa("process_jira"):
+                n_jira = self._jira(fuentes, today)
+            with METRICS.etapa("process_clockify"):
+                n_cw = self._clockify(fuentes)
+        except Exception:
+            self.reset(None)     # a medio aplicar no sirve: el próximo arma de cero
+            raise
+        return self.agg, n_jira, n_cw
+
+    def _jira(self, fuentes, today):
+        agg, nuevas = self.agg, {}
+        for tipo, _, issues, prefijo in fuentes:
+            if tipo == "jira":
+                for issue in issues:
+                    nuevas[prefijo + issue["key"]] = (issue, prefijo)
+        bajas = [tid for tid in self.issues if tid not in nuevas]
+        for tid in bajas:
+            del self.issues[tid]
+            if tid in agg.tasks:
+                agg.remove(tid)
+        n, altas = len(bajas), set()
+        for tid, (issue, prefijo) in nuevas.items():
+            prev = self.issues.get(tid)
+            if prev is issue or prev == issue:
+                continue
+            self.issues[tid] = issue
+            t = tarea_jira(issue, prefijo, today)
+            if t:
+                antes = agg.tasks.get(tid)
+                agg.upsert(*t, en_su_lugar=True)
+                if not antes or antes[:2] != t[:2]:
+                    altas.add(t[:2])
+            elif tid in agg.tasks:       # pasó a un proyecto sin cliente
+                agg.remove(tid)
+            n += 1
+
+        # Una tarea nueva (o que cambió de proyecto) queda al final; si no es ahí donde
+        # cae en lo bajado, el proyecto se reordena para que quede igual que armado de cero
+        if altas:
+            pos = {tid: i for i, tid in enumerate(nuevas)}
+            for cl, prj in altas:
+                tareas = agg.projects[cl][prj]
+                orden  = [pos[tid] for tid in tareas]
+                if orden != sorted(orden):
+                    agg.projects[cl][prj] = dict(sorted(tareas.items(), key=lambda kv: pos[kv[0]]))
+        return n
+
+    def _clockify(self, fuentes):
+        agg, nuevas = self.agg, {}
+        for tipo, nombre, entries, _ in fuentes:
+            if tipo == "clockify":
+                for e in entries:
+                    eid    = e.get("id") or e.get("_id") or ""   # "_id" sin clockify_incremental
+                    key, i = (nombre, eid), 0
+                    while key in nuevas:    # sin id (o repetida): cuenta igual, como antes
+                        i  += 1
+                        key = (nombre, eid, i)
+                    nuevas[key] = e
+        n, tocados = 0, set()
+        for key in [k for k in self.entries if k not in nuevas]:
+            _, proj, user, horas, _ = self.entries.pop(key)
+            agg.remove_time(proj, user, horas)
+            tocados.add(CW_TO_JIRA.get(proj))
+            n += 1
+        for key, e in nuevas.items():
+            prev = self.entries.get(key)
+            if prev and (prev[0] is e or prev[0] == e):
+                continue
+            if prev:
+                agg.remove_time(*prev[1:4])
+                tocados.add(CW_TO_JIRA.get(prev[1]))
+            proj, user, horas, fila = entrada_clockify(e)
+            agg.add_time(proj, user, horas)
+            tocados.add(CW_TO_JIRA.get(proj))
+            self.entries[key] = (e, proj, user, horas, fila)
+            n += 1
+
+        # Los usuarios de cada proyecto van en el orden de su primera entrada, que
+        # cambia con altas y bajas: se reordenan los proyectos tocados
+        if tocados:
+            pos = {}
+            for key in nuevas:
+                _, proj, user, _, _ = self.entries[key]
+                pos.setdefault((CW_TO_JIRA.get(proj), user), len(pos))
+            for jira_proj in tocados & agg.cw_proj.keys():
+                users = agg.cw_proj[jira_proj]["users"]
+                users_ord = dict(sorted(users.items(), key=lambda kv: pos[(jira_proj, kv[0])]))
+                if list(users_ord) != list(users):
+                    agg.cw_proj[jira_proj]["users"] = users_ord
+        return n
+
+    def entradas(self):
+        return [v[4] for v in self.entries.values()]
+
+INCREMENTAL = Incremental()
+
+def armar(cfg, fuentes):
+    """Clasifica y agrega lo bajado (issues y entradas crudas) con los mapeos vigentes.
+
+    No pide nada a las APIs: es lo único que se repite cuando cambia mapeos.json.
+    """
+    alm = almacen(cfg)
+    # El Agregador no es thread-safe: lo bajado se aplica acá, en orden (Jira y después
+    # Clockify), y con los mapeos fijos mientras tanto
+    with mapeos.LOCK:
+        agg, n_jira, n_cw = INCREMENTAL.aplicar(fuentes)
+        METRICS.set("aggregate_changes", n_jira, fuente="jira")
+        METRICS.set("aggregate_changes", n_cw, fuente="clockify")
+
+        if alm:
+            with METRICS.etapa("sqlite"):
+                alm.guardar(agg, INCREMENTAL.entradas())
+
+        print("Armando datos del dashboard...")
+        with METRICS.etapa("build_data"):
+            return build_data(agg)
+
+# ── SQLITE (opcional) ────────────────────────────────────────────
+_almacenes = {}
+
+def almacen(cfg):
+    """Almacen de "sqlite_path" (abierto una sola vez), o None si no está configurado."""
+    path = cfg.get("sqlite_path")
+    if not path:
+        return None
+    if path not in _almacenes:
+        _almacenes[path] = Almacen(path)
+    return _almacenes[path]
+
+# ── HISTORIAL DE KPIs ────────────────────────────────────────────
+_historiales = {}
+
+def historial(cfg):
+    """Historial de "history_file" (cargado una sola vez), o None si está desactivado."""
+    path = cfg.get("history_file", HISTORY_FILE)
+    if not path:
+        return None
+    if path not in _historiales:
+        _historiales[path] = Historial(path)
+    return _historiales[path]
+
+# ── SNAPSHOT EN MEMORIA ──────────────────────────────────────────
+def has_credentials(cfg):
+    return bool(cfg.get("jira_token") or cfg.get("clockify_key")
+                or cfg.get("jira_sites") or cfg.get("clockify_workspaces"))
+
+class Snapshot:
+    """Último dataset armado, compartido entre el scheduler y los requests."""
+
+    def __init__(self):
+        self.lock    = threading.Lock()
+        self.wake    = threading.Event()
+        self.clients = None
+        self.ts      = None     # datetime del último refresh exitoso
+        self.payload = None     # JSON de /api/data ya serializado, con su ETag
+        self.etag    = None
+        self.index   = None     # TaskIndex del snapshot actual, armado a demanda
+        self.parts   = {}       # /api/summary y /api/clients/<nombre> ya serializados, a demanda
+        self.error   = None
+        self.flight  = None     # refresh en curso; los pedidos concurrentes lo esperan
+        self.coalesced = 0      # pedidos de refresh que se sumaron a uno en curso
+        self.version = 0        # sube en cada publish; /api/data?since=<version>&epoch=<epoch>
+        self.epoch   = format(time.time_ns(), "x")   # identifica este proceso: la versión vuelve a 0 al reiniciar
+        self.deltas  = deque(maxlen=DELTA_HISTORY)   # (versión, delta desde la anterior)
+        self.publishing = threading.RLock()          # un publish a la vez (refresh, perfilado, preload)
+        self.fuentes = None     # issues y entradas crudas del último fetch, para re-agregar
+
+    def refresh(self, cfg=None, build=None):
+        """Reconstruye el dataset y devuelve (clients, ts).
+
+        Si ya hay un refresh en curso no se lanza otro: se espera ese y se
+        devuelve su mismo resultado (o su misma excepción).
+
+        `build(cfg)` reemplaza a fetch_all (p.ej. para perfilarlo); ese pedido no
+        se suma a uno en curso sino que lo espera y después hace el suyo.
+        """
+        while True:
+            with self.lock:
+                flight = self.flight
+                leader = flight is None
+                if leader:
+                    flight = self.flight = {"done": threading.Event(), "result": None, "error": None}
+                elif build is None:
+                    self.coalesced += 1
+                    METRICS.inc("refresh_coalesced_total")
+            if leader:
+                break
+            flight["done"].wait()
+            if build is None:
+                if flight["error"]:
+                    raise flight["error"]
+                return flight["result"]
+
+        try:
+            cfg = cfg or load_config()
+            if not has_credentials(cfg):
+                flight["result"] = self.get()
+                return flight["result"]
+            with METRICS.etapa("refresh"):
+                data, fuentes = (build or fetch_all)(cfg)
+                ts = datetime.now()
+                flight["result"] = self.publish(data, ts, fuentes)
+                hist = historial(cfg)
+                if hist:
+                    with METRICS.etapa("historial"):
+                        hist.append(data, ts.isoformat(timespec="seconds"))
+            METRICS.inc("refresh_total", resultado="ok")
+            return flight["result"]
+        except Exception as e:
+            METRICS.inc("refresh_total", resultado="error")
+            flight["error"] = e
+            with self.lock:
+                self.error = str(e)
+            raise
+        finally:
+            with self.lock:
+                self.flight = None
+            flight["done"].set()
+
+    def publish(self, data, ts, fuentes=None):
+        with self.publishing:
+            if fuentes is not None:
+                self.fuentes = fuentes
+            old, version = self.clients, self.version + 1
+            delta = diff_snapshots(old, data) if old is not None else None
+            with METRICS.etapa("json"):
+                payload = json.dumps({"clients": data, "ts": ts.isoformat(), "version": version,
+                                      "epoch": self.epoch, "full": True},
+                                     default=json_default, ensure_ascii=False).encode("utf-8")
+            with self.lock:
+                self.clients, self.ts, self.error = data, ts, None
+                self.version = version
+                self.payload = payload
+                self.etag    = f'"{hashlib.sha1(payload).hexdigest()[:20]}"'
+                self.index   = None
+                self.parts   = {}
+                if delta is None:       # sin snapshot anterior no hay desde dónde calcular
+                    self.deltas.clear()
+                else:
+                    self.deltas.append((version, delta))
+        cambios = delta and evento_cambios(delta)
+        if cambios:
+            STREAM.send("cambios", dict(cambios, version=version, epoch=self.epoch, ts=ts.isoformat()))
+        return data, ts
+
+    def delta_body(self, since, epoch):
+        """(payload, etag) con lo que cambió desde la versión `since`, o (None, None)
+        si esa versión ya no está en la historia o la emitió otro proceso (`epoch`
+        distinto: el servidor se reinició), y el cliente pide el snapshot completo."""
+        with self.lock:
+            if self.payload is None or epoch != self.epoch:
+                return None, None
+            clients, version, ts = self.clients, self.version, self.ts
+            deltas, parts = list(self.deltas), self.parts
+        key = ("since", since)
+        if key not in parts:
+            if since == version:        # ya está al día: delta vacío
+                delta = merge_deltas([])
+                delta["orden"] = [c["nombre"] for c in clients]
+            elif deltas and deltas[0][0] - 1 <= since < version:
+                delta = merge_deltas(d for v, d in deltas if v > since)
+            else:
+                return None, None
+            payload = json.dumps(delta_payload(delta, since, version, self.epoch, ts, clients),
+                                 default=json_default, ensure_ascii=False).encode("utf-8")
+            parts[key] = payload, f'"{hashlib.sha1(payload).hexdigest()[:20]}"'
+        return parts[key]
+
+    def reaggregate(self):
+        """Vuelve a armar el snapshot desde lo último que se bajó, con los mapeos
+        vigentes y sin tocar las APIs; devuelve (clients, ts) o None si no hay fetch previo."""
+        with self.publishing:   # que un refresh no publique en el medio con otras fuentes
+            if self.fuentes is None:
+                return None
+            with METRICS.etapa("reaggregate"):
+                data = armar(load_config(), self.fuentes)
+                return self.publish(data, self.ts or datetime.now())
+
+    def preload(self):
+        """Al arrancar, publica lo último guardado en SQLite (si hay) sin esperar a la red."""
+        alm = almacen(load_config())
+        ts  = alm and alm.actualizado()
+        if ts:
+            self.publish(build_data(alm.agregador(hoy=datetime.utcnow().date())), ts)
+            print(f"  Snapshot inicial desde {alm.path} ({ts:%d/%m %H:%M})")
+
+    def invalidate(self):
+        """Descarta el dataset (p.ej. cambiaron las credenciales) y despierta al scheduler."""
+        with self.lock:
+            self.clients, self.ts = None, None
+            self.payload, self.etag, self.index = None, None, None
+            self.parts, self.fuentes = {}, None
+        self.wake.set()
+
+    def get(self):
+        with self.lock:
+            return self.clients, self.ts
+
+    def body(self):
+        with self.lock:
+            return self.payload, self.etag
+
+    def part(self, cliente=None):
+        """(payload, etag) del resumen de KPIs (cliente=None) o de un cliente con sus
+        proyectos y tareas; se serializa la primera vez que se pide en cada snapshot.
+        (None, None) si no hay snapshot o no existe el cliente."""
+        with self.lock:
+            clients, ts, version, parts = self.clients, self.ts, self.version, self.parts
+        if clients is None:
+            return None, None
+        key = cliente or ""
+        if key not in parts:
+            if cliente is None:
+                obj = {"clients": [{k: v for k, v in c.items() if k != "proyectos"} for c in clients]}
+            else:
+                obj = {"client": next((c for c in clients if c["nombre"] == cliente), None)}
+                if obj["client"] is None:
+                    return None, None
+            obj["ts"], obj["version"], obj["epoch"] = ts.isoformat(), version, self.epoch
+            payload = json.dumps(obj, default=json_default, ensure_ascii=False).encode("utf-8")
+            parts[key] = payload, f'"{hashlib.sha1(payload).hexdigest()[:20]}"'
+        return parts[key]
+
+    def task_index(self):
+        """(TaskIndex, ts) del snapshot actual, o (None, None) si no hay snapshot."""
+        with self.lock:
+            clients, ts, index = self.clients, self.ts, self.index
+        if index is None and clients is not None:
+            index = TaskIndex(clients)
+            with self.lock:
+                if self.clients is clients:
+                    self.index = index
+        return index, ts
+
+    def age(self):
+        with self.lock:
+            return round((datetime.now() - self.ts).total_seconds(), 1) if self.ts else None
+
+# ── ÍNDICES DE TAREAS (/api/tasks) ───────────────────────────────
+SEM_ORDER  = {"rojo": 0, "amarillo": 1, "verde": 2, "gris": 3}
+SORT_KEYS  = {   # mismas claves que getSortValue() en index.html
+    "resumen":          lambda t: (t.resumen or "").lower(),
+    "persona":          lambda t: (t.persona or "").lower(),
+    "sem_horas":        lambda t: SEM_ORDER.get(t.sem_horas, 9),
+    "sem_fecha":        lambda t: SEM_ORDER.get(t.sem_fecha, 9),
+    "horas_estimadas":  lambda t: t.horas_estimadas  if t.horas_estimadas  is not None else -1,
+    "horas_consumidas": lambda t: t.horas_consumidas if t.horas_consumidas is not None else -1,
+    "horas_pendientes": lambda t: t.horas_pendientes if t.horas_pendientes is not None else -1,
+    "fecha_fin":        lambda t: (t.fecha_fin is None, t.fecha_fin or ""),
+    "fecha_fin_real":   lambda t: (t.fecha_fin_real is None, (t.fecha_fin_real or "")[:10]),
+}
+INDEXED = ("cliente", "proyecto", "persona", "estado", "sem_fecha", "sem_horas")
+SORT_SCAN = 8   # con más de 1/SORT_SCAN de las tareas filtradas se recorre el orden precalculado
+
+class TaskIndex:
+    """Índices invertidos y órdenes precalculados sobre las tareas de un snapshot."""
+
+    def __init__(self, clients):
+        self.tasks, self.where = [], []      # Tarea y su (cliente, proyecto), en paralelo
+        for c in clients:
+            for p in c["proyectos"]:
+                for t in p["tareas"]:
+                    self.tasks.append(t)
+                    self.where.append((c["nombre"], p["nombre"]))
+        self.search = [f"{t.resumen or ''}\x00{t.id}".lower() for t in self.tasks]
+
+        self.by = {k: {} for k in INDEXED}
+        for i, t in enumerate(self.tasks):
+            for k in INDEXED:
+                self.by[k].setdefault(self.value(i, k), []).append(i)
+
+        # sort() es estable también con reverse=True, igual que el sort del frontend.
+        # ranks[col][dir][i] = posición de la tarea i en ese orden, para ordenar subconjuntos chicos
+        self.orders, self.ranks = {}, {}
+        for col, key in SORT_KEYS.items():
+            asc  = sorted(range(len(self.tasks)), key=lambda i: key(self.tasks[i]))
+            desc = sorted(range(len(self.tasks)), key=lambda i: key(self.tasks[i]), reverse=True)
+            self.orders[col] = {"asc": asc, "desc": desc}
+            self.ranks[col]  = {d: self._ranks(o) for d, o in self.orders[col].items()}
+
+        # Opciones de los selects (populateFilterOptions) por (cliente, proyecto); "" = sin filtro
+        scopes = {}
+        for i, t in enumerate(self.tasks):
+            cl, prj = self.where[i]
+            for key in ((cl, prj), (cl, ""), ("", prj), ("", "")):
+                personas, estados = scopes.setdefault(key, (set(), set()))
+                if t.persona:
+                    personas.add(t.persona)
+                if t.estado:
+                    estados.add(t.estado)
+        self.opciones = {key: {"personas": sorted(p), "estados": sorted(e)}
+                         for key, (p, e) in scopes.items()}
+
+    @staticmethod
+    def _ranks(order):
+        rank = [0] * len(order)
+        for pos, i in enumerate(order):
+            rank[i] = pos
+        return rank
+
+    def value(self, i, k):
+        if k == "cliente":
+            return self.where[i][0]
+        if k == "proyecto":
+            return self.where[i][1]
+        return getattr(self.tasks[i], k)
 
-    cw_by_proj, cw_by_cl = {}, {}
-    if cfg.get("clockify_key"):
-        print("Conectando con Clockify...")
-        cw_by_proj, cw_by_cl = fetch_clockify(cfg)
+    def row(self, i):
+        cl, prj = self.where[i]
+        return {**self.tasks[i].as_api_dict(), "cliente": cl, "proyecto": prj}
 
-    print("Armando datos del dashboard...")
-    return build_data(jira_by_cl, cw_by_proj, cw_by_cl)
+    def query(self, filters, q="", desde=None, hasta=None, sort=None, direction="asc",
+              page=1, limit=100):
+        ids = None
+        for k in INDEXED:
+            if filters.get(k):
+                hits = set(self.by[k].get(filters[k], ()))
+                ids  = hits if ids is None else ids & hits
+
+        term = q.lower()
+        def keep(i):
+            if ids is not None and i not in ids:
+                return False
+            if term and term not in self.search[i]:
+                return False
+            ff = self.tasks[i].fecha_fin
+            if (desde or hasta) and not ff:
+                return False
+            if desde and ff < desde:
+                return False
+            if hasta and ff > hasta:
+                return False
+            return True
+
+        if ids is None:
+            order = self.orders[sort][direction] if sort in self.orders else range(len(self.tasks))
+        elif sort in self.orders and len(ids) * SORT_SCAN > len(self.tasks):
+            order = self.orders[sort][direction]
+        elif sort in self.orders:
+            order = sorted(ids, key=self.ranks[sort][direction].__getitem__)
+        else:
+            order = sorted(ids)
+        matched = [i for i in order if keep(i)]
+
+        scope = (filters.get("cliente") or "", filters.get("proyecto") or "")
+        start = (page - 1) * limit
+        return {
+            "total":  len(matched),
+            "page":   page,
+            "limit":  limit,
+            "tareas": [self.row(i) for i in matched[start:start + limit]],
+            "opciones": self.opciones.get(scope, {"personas": [], "estados": []}),
+        }
+
+def scheduler_loop(snap):
+    """Refresca el snapshot cada `refresh_interval` segundos (o antes si lo despiertan)."""
+    while True:
+        try:
+            snap.refresh()
+        except Exception:
+            traceback.print_exc()
+        try:
+            interval = max(REFRESH_MIN, float(load_config().get("refresh_interval", REFRESH_INTERVAL)))
+        except (OSError, TypeError, ValueError):   # null, texto o config.json a medio escribir
+            interval = REFRESH_INTERVAL
+        snap.wake.wait(interval)
+        snap.wake.clear()
+
+def vigilar_mapeos(snap, path=mapeos.MAPEOS_FILE):
+    """Recarga mapeos.json cuando cambia y re-agrega el snapshot en memoria.
+
+    Si cambiaron los proyectos de Jira y la JQL es la de por defecto, además se
+    despierta al scheduler para bajar las issues de los proyectos nuevos.
+    """
+    def firma():
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    last = firma()
+    while True:
+        time.sleep(MAPEOS_POLL_SECS)
+        cur = firma()
+        if cur == last:
+            continue
+        last = cur
+        jql_antes = build_default_jql()
+        try:
+            mapeos.cargar(path)
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️  No se pudo recargar {path}: {e}; siguen los mapeos anteriores")
+            continue
+        # Nada de lo que sigue puede terminar el hilo: ediciones posteriores se tienen que ver
+        try:
+            t0   = time.perf_counter()
+            done = snap.reaggregate()
+            if done:
+                print(f"  Mapeos recargados desde {path}; snapshot re-agregado en "
+                      f"{time.perf_counter() - t0:.2f}s")
+            else:
+                print(f"  Mapeos recargados desde {path}; se aplican en el próximo refresh")
+            if build_default_jql() != jql_antes and not load_config().get("jira_jql"):
+                snap.wake.set()
+        except Exception:
+            traceback.print_exc()
+
+SNAPSHOT = Snapshot()
+
+# ── CAMBIOS ENTRE SNAPSHOTS (/api/data?since=, /api/stream) ──────
+def diff_snapshots(old, new):
+    """Qué cambió de `old` a `new` (listas de build_data), comparando las tareas por clave.
+
+    {"clientes":  {nombre: bloque sin proyectos, o None si se fue},
+     "proyectos": {(cliente, proyecto): bloque sin tareas, o None},
+     "tareas":    {id: (cliente, proyecto, Tarea)}     altas y modificaciones,
+     "eliminadas": {id, ...},
+     "previas":   {id: (cliente, proyecto)}            dónde estaban antes,
+     "orden":     [clientes en el orden del snapshot nuevo]}
+    """
+    def index(clients):
+        cli, prj, tareas = {}, {}, {}
+        for c in clients:
+            cli[c["nombre"]] = {k: v for k, v in c.items() if k != "proyectos"}
+            for p in c["proyectos"]:
+                prj[(c["nombre"], p["nombre"])] = {k: v for k, v in p.items() if k != "tareas"}
+                for t in p["tareas"]:
+                    tareas[t.id] = (c["nombre"], p["nombre"], t)
+        return cli, prj, tareas
+
+    old_cli, old_prj, old_t = index(old)
+    new_cli, new_prj, new_t = index(new)
+    tareas = {}
+    for k, (cl, prj, t) in new_t.items():
+        prev = old_t.get(k)
+        if prev is None or prev[:2] != (cl, prj) or prev[2].valores() != t.valores():
+            tareas[k] = (cl, prj, t)
+    eliminadas = {k for k in old_t if k not in new_t}
+    return {
+        "clientes":   {k: new_cli.get(k) for k in old_cli.keys() | new_cli.keys()
+                       if old_cli.get(k) != new_cli.get(k)},
+        "proyectos":  {k: new_prj.get(k) for k in old_prj.keys() | new_prj.keys()
+                       if old_prj.get(k) != new_prj.get(k)},
+        "tareas":     tareas,
+        "eliminadas": eliminadas,
+        "previas":    {k: old_t[k][:2] for k in list(tareas) + list(eliminadas) if k in old_t},
+        "orden":      [c["nombre"] for c in new],
+    }
+
+def merge_deltas(deltas):
+    """Un solo delta equivalente a aplicar `deltas` en orden."""
+    out = {"clientes": {}, "proyectos": {}, "tareas": {}, "eliminadas": set(), "previas": {}, "orden": []}
+    for d in deltas:
+        out["clientes"].update(d["clientes"])
+        out["proyectos"].update(d["proyectos"])
+        for k, v in d["previas"].items():
+            out["previas"].setdefault(k, v)
+        for k, v in d["tareas"].items():
+            out["tareas"][k] = v
+            out["eliminadas"].discard(k)
+        for k in d["eliminadas"]:
+            out["tareas"].pop(k, None)
+            out["eliminadas"].add(k)
+        out["orden"] = d["orden"]
+    return out
+
+def evento_cambios(delta):
+    """Resumen del delta para /api/stream: solo nombres e ids (None si no cambió nada)."""
+    proyectos  = set(delta["proyectos"])
+    proyectos |= {v[:2] for v in delta["tareas"].values()} | set(delta["previas"].values())
+    clientes   = set(delta["clientes"]) | {cl for cl, _ in proyectos}
+    if not clientes:
+        return None
+    cambiadas, eliminadas = list(delta["tareas"]), sorted(delta["eliminadas"])
+    return {
+        "clientes":   sorted(clientes),
+        "proyectos":  sorted([cl, prj] for cl, prj in proyectos),
+        "tareas":     cambiadas[:SSE_MAX_TAREAS],
+        "eliminadas": eliminadas[:max(0, SSE_MAX_TAREAS - len(cambiadas))],
+        "truncado":   len(cambiadas) + len(eliminadas) > SSE_MAX_TAREAS,
+    }
+
+def delta_payload(delta, since, version, epoch, ts, clients):
+    """Cuerpo de /api/data?since=: bloques de KPIs y tareas que cambiaron.
+
+    Cada tarea lleva "posicion", su índice en el proyecto del snapshot `clients`:
+    las que no cambiaron conservan su orden relativo, así que insertando las
+    cambiadas en orden de posición el cliente queda igual que el snapshot.
+    """
+    tocados = {(cl, prj) for cl, prj, _ in delta["tareas"].values()}
+    posicion = {t.id: i for c in clients for p in c["proyectos"] if (c["nombre"], p["nombre"]) in tocados
+                for i, t in enumerate(p["tareas"])}
+    return {
+        "version":              version,
+        "since":                since,
+        "epoch":                epoch,
+        "full":                 False,
+        "ts":                   ts.isoformat(),
+        "orden":                delta["orden"],
+        "clientes":             [b for b in delta["clientes"].values() if b is not None],
+        "clientes_eliminados":  sorted(k for k, b in delta["clientes"].items() if b is None),
+        "proyectos":            [dict(b, cliente=cl) for (cl, _), b in delta["proyectos"].items()
+                                 if b is not None],
+        "proyectos_eliminados": sorted([cl, prj] for (cl, prj), b in delta["proyectos"].items()
+                                       if b is None),
+        "tareas":               [dict(t.as_api_dict(), cliente=cl, proyecto=prj, posicion=posicion[t.id])
+                                 for cl, prj, t in delta["tareas"].values()],
+        "tareas_eliminadas":    sorted(delta["eliminadas"]),
+    }
+
+# ── SSE (/api/stream) ────────────────────────────────────────────
+class Difusor:
+    """Todas las conexiones de /api/stream las atiende un único hilo con sockets
+    no bloqueantes y un selector: el worker del pool manda los headers, le pasa
+    el socket y queda libre. Miles de pestañas abiertas no ocupan threads."""
+
+    def __init__(self):
+        self.sel     = selectors.DefaultSelector()
+        self.lock    = threading.Lock()
+        self.pending = []     # sockets recién llegados
+        self.events  = []     # mensajes a difundir
+        self.conns   = {}     # socket → bytearray pendiente de enviar
+        self.r, self.w = socket.socketpair()
+        self.r.setblocking(False)
+        self.w.setblocking(False)
+        self.sel.register(self.r, selectors.EVENT_READ)
+        self.thread  = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True, name="sse")
+        self.thread.start()
+
+    def add(self, sock):
+        with self.lock:
+            self.pending.append(sock)
+        self._wake()
+
+    def send(self, event, data):
+        if self.thread is None:     # sin servidor HTTP (benchmarks, scripts) no hay a quién mandar
+            return
+        msg = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+        with self.lock:
+            self.events.append(msg)
+        self._wake()
+
+    def count(self):
+        return len(self.conns)
+
+    def _wake(self):
+        try:
+            self.w.send(b"x")
+        except OSError:       # buffer lleno: ya hay un aviso pendiente
+            pass
+
+    def _drop(self, sock):
+        self.sel.unregister(sock)
+        del self.conns[sock]
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def _flush(self, sock):
+        buf = self.conns[sock]
+        try:
+            del buf[:sock.send(buf)]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(sock)
+            return
+        if len(buf) > SSE_MAX_BUFFER:
+            self._drop(sock)
+            return
+        self.sel.modify(sock, selectors.EVENT_READ | (selectors.EVENT_WRITE if buf else 0))
+
+    def run(self):
+        last_ping = time.monotonic()
+        while True:
+            for key, mask in self.sel.select(timeout=SSE_PING_SECS):
+                sock = key.fileobj
+                if sock is self.r:
+                    try:
+                        while self.r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                if sock not in self.conns:
+                    continue
+                if mask & selectors.EVENT_READ:
+                    try:
+                        closed = not sock.recv(4096)    # el cliente no manda nada: b"" = se fue
+                    except BlockingIOError:
+                        closed = False
+                    except OSError:
+                        closed = True
+                    if closed:
+                        self._drop(sock)
+                        continue
+                if mask & selectors.EVENT_WRITE:
+                    self._flush(sock)
+
+            with self.lock:
+                pending, self.pending = self.pending, []
+                events,  self.events  = self.events,  []
+            for sock in pending:
+                sock.setblocking(False)
+                self.conns[sock] = bytearray(b"retry: 5000\n\n")
+                self.sel.register(sock, selectors.EVENT_READ)
+                self._flush(sock)
+            if time.monotonic() - last_ping >= SSE_PING_SECS:
+                events.append(b": ping\n\n")
+                last_ping = time.monotonic()
+            for msg in events:
+                for sock in list(self.conns):
+                    self.conns[sock] += msg
+                    self._flush(sock)
+
+STREAM = Difusor()
 
 # ── HTTP SERVER ──────────────────────────────────────────────────
 MIME = {
@@ -336,41 +1416,207 @@ MIME = {
     "jpeg": "image/jpeg",
     "png":  "image/png",
     "ico":  "image/x-icon",
+    "json": "application/json; charset=utf-8",
+    "svg":  "image/svg+xml",
 }
 
+# ── COMPRESIÓN / ETAG ────────────────────────────────────────────
+_compressed      = {}        # (etag, encoding) → bytes; cada versión se comprime una sola vez
+_compressed_lock = threading.Lock()
+
+def pick_encoding(accept):
+    """Elige br/gzip según Accept-Encoding (ignora los que vienen con q=0)."""
+    offered = {}
+    for part in accept.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    if brotli and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+def compress(data, enc, etag=None):
+    key = (etag, enc)
+    if etag:
+        with _compressed_lock:
+            if key in _compressed:
+                return _compressed[key]
+    out = brotli.compress(data) if enc == "br" else gzip.compress(data, 6)
+    if etag:
+        with _compressed_lock:
+            if len(_compressed) >= 64:
+                _compressed.pop(next(iter(_compressed)))
+            _compressed[key] = out
+    return out
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match or not etag:
+        return False
+    base = etag.strip('"')
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        tag = tag[2:] if tag.startswith("W/") else tag
+        # Las variantes comprimidas llevan sufijo (-gzip / -br) sobre el mismo ETag base
+        if tag.strip('"').split("-")[0] == base:
+            return True
+    return False
+
+# ── ESTÁTICOS EN MEMORIA ─────────────────────────────────────────
+COMPRESSIBLE = ("text/", "application/json", "image/svg")
+
+class StaticCache:
+    """Estáticos en memoria con sus variantes gzip/br ya comprimidas.
+
+    Cada entrada se invalida cuando cambian mtime o tamaño del archivo. Los
+    archivos grandes solo guardan metadatos (ETag) y se envían con sendfile.
+    """
+
+    def __init__(self, root):
+        self.root    = os.path.realpath(root)
+        self.entries = {}
+        self.lock    = threading.Lock()
+
+    def private(self):
+        """Rutas absolutas que nunca se sirven (ni nada que empiece igual): credenciales,
+        stores locales y los archivos que config.json nombre ahora mismo."""
+        cfg   = load_config()
+        paths = [CONFIG_FILE, os.path.splitext(JIRA_STORE_FILE)[0], CLOCKIFY_CACHE, PROFILE_DIR,
+                 cfg.get("history_file", HISTORY_FILE), cfg.get("sqlite_path")]
+        return tuple(os.path.realpath(os.path.join(self.root, p)) for p in paths if p)
+
+    def resolve(self, url_path):
+        """URL → ruta absoluta dentro de root, o None si sale de ahí, es privada o no
+        es de un tipo que sirva el dashboard (MIME)."""
+        rel = os.path.normpath(unquote(url_path).lstrip("/"))
+        if rel.startswith("..") or os.path.isabs(rel):
+            return None
+        if any(p.startswith(".") for p in rel.split(os.sep)):
+            return None
+        if os.path.splitext(rel)[1][1:].lower() not in MIME:     # ni CSV, ni SQLite, ni .py
+            return None
+        full = os.path.realpath(os.path.join(self.root, rel))
+        if os.path.commonpath([self.root, full]) != self.root or not os.path.isfile(full):
+            return None
+        if full.startswith(self.private()):
+            return None
+        return full
+
+    def get(self, full):
+        st = os.stat(full)
+        with self.lock:
+            entry = self.entries.get(full)
+        if entry and (entry["mtime"], entry["size"]) == (st.st_mtime, st.st_size):
+            return entry
+
+        ext   = full.rsplit(".", 1)[-1].lower() if "." in os.path.basename(full) else ""
+        ct    = MIME.get(ext, "application/octet-stream")
+        entry = {"mtime": st.st_mtime, "size": st.st_size, "ct": ct, "data": None, "variants": {}}
+        h = hashlib.sha1()
+        with open(full, "rb") as f:
+            if st.st_size <= STATIC_CACHE_MAX:
+                entry["data"] = f.read()
+                h.update(entry["data"])
+            else:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        entry["etag"] = f'"{h.hexdigest()[:20]}"'
+
+        data = entry["data"]
+        if data is not None and len(data) >= COMPRESS_MIN and ct.startswith(COMPRESSIBLE):
+            entry["variants"]["gzip"] = gzip.compress(data, 9)
+            if brotli:
+                entry["variants"]["br"] = brotli.compress(data)
+        with self.lock:
+            self.entries[full] = entry
+        return entry
+
+STATIC = StaticCache(STATIC_ROOT)
+
+class PooledHTTPServer(ThreadingHTTPServer):
+    """Atiende cada conexión en un pool acotado de threads: un refresh lento no
+    bloquea los estáticos y muchos usuarios a la vez no disparan threads sin límite."""
+    daemon_threads     = True
+    request_queue_size = 64
+
+    def __init__(self, addr, handler, workers=SERVER_WORKERS):
+        super().__init__(addr, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        self.detached = set()
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+    def detach(self, request):
+        """El socket pasa a otro dueño (/api/stream): el pool no lo cierra al terminar."""
+        self.detached.add(request)
+
+    def shutdown_request(self, request):
+        if request in self.detached:
+            self.detached.discard(request)
+            return
+        super().shutdown_request(request)
+
 class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    timeout          = REQUEST_TIMEOUT
 
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET,POST,OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "Content-Type")
+        self.send_header("Content-Length", 0)
         self.end_headers()
 
     def do_GET(self):
-        path = urlparse(self.path).path
+        url  = urlparse(self.path)
+        path = url.path
+        self.query = parse_qs(url.query)
         if path in ("/", "/index.html"):
-            self._serve_file("index.html", MIME["html"])
+            self._serve_file("/index.html")
         elif path == "/api/data":
             self._handle_data()
+        elif path == "/api/tasks":
+            self._handle_tasks()
+        elif path == "/api/summary":
+            self._handle_part()
+        elif path.startswith("/api/clients/") and len(path) > len("/api/clients/"):
+            self._handle_part(unquote(path[len("/api/clients/"):]))
+        elif path == "/api/stream":
+            self._handle_stream()
+        elif path == "/api/history":
+            self._handle_history()
+        elif path == "/api/metrics":
+            self._handle_metrics()
+        elif path == "/api/mapeos":
+            self._json(mapeos.actuales())
         elif path == "/api/config":
             cfg  = load_config()
             safe = {
                 "jira_domain":        cfg.get("jira_domain", ""),
                 "jira_email":         cfg.get("jira_email",  ""),
                 "jira_jql":           cfg.get("jira_jql",    ""),
-                "has_jira":           bool(cfg.get("jira_token")),
-                "has_clockify":       bool(cfg.get("clockify_key")),
+                "has_jira":           bool(cfg.get("jira_token") or cfg.get("jira_sites")),
+                "has_clockify":       bool(cfg.get("clockify_key") or cfg.get("clockify_workspaces")),
                 "clockify_date_from": cfg.get("clockify_date_from",
                                               f"{datetime.now().year}-01-01T00:00:00.000Z"),
             }
             self._json(safe)
         else:
-            # Static files
-            fname = path.lstrip("/")
-            ext   = fname.rsplit(".", 1)[-1].lower() if "." in fname else ""
-            ct    = MIME.get(ext, "application/octet-stream")
-            self._serve_file(fname, ct)
+            self._serve_file(path)
 
     def do_POST(self):
         path   = urlparse(self.path).path
@@ -381,52 +1627,306 @@ class Handler(BaseHTTPRequestHandler):
             cfg = load_config()
             cfg.update({k: v for k, v in body.items() if v != ""})
             save_config(cfg)
+            SNAPSHOT.invalidate()
             self._json({"ok": True})
         else:
             self.send_error(404)
 
     def _handle_data(self):
-        cfg = load_config()
-        if not cfg.get("jira_token") and not cfg.get("clockify_key"):
+        if not has_credentials(load_config()):
             self._json({"error": "No hay credenciales configuradas"}, 400)
             return
+        if self.query.get("profile", ["0"])[0] not in ("", "0"):
+            self._handle_profile()
+            return
+        force = self.query.get("force", ["0"])[0] not in ("", "0")
+        since = self.query.get("since", [""])[0]
+        since = int(since) if since.isdigit() else None
+        epoch = self.query.get("epoch", [""])[0]
         try:
-            data = fetch_all(cfg)
-            self._json({"clients": data, "ts": datetime.now().isoformat()})
+            payload, etag = SNAPSHOT.body()
+            # Sin snapshot todavía (primer arranque o credenciales nuevas) → refresco síncrono
+            if force or payload is None:
+                SNAPSHOT.refresh()
+                payload, etag = SNAPSHOT.body()
+            # ?since=<versión>&epoch=<epoch>: solo lo que cambió; si la versión es muy vieja
+            # o es de otro proceso (el servidor se reinició) va el snapshot entero
+            if since is not None:
+                delta, delta_etag = SNAPSHOT.delta_body(since, epoch)
+                if delta is not None:
+                    payload, etag = delta, delta_etag
+            # Edad y deduplicación van en headers para que el cuerpo (y su ETag) sea fijo por snapshot
+            self._send(payload, "application/json; charset=utf-8", etag=etag, cors=True,
+                       extra={"X-Snapshot-Age": int(SNAPSHOT.age() or 0),
+                              "X-Refresh-Dedup": SNAPSHOT.coalesced})
         except Exception as e:
-            import traceback; traceback.print_exc()
+            traceback.print_exc()
             self._json({"error": str(e)}, 500)
 
-    def _serve_file(self, path, ct):
+    def _handle_profile(self):
+        """/api/data?profile=1[&memoria=1] con el header X-Profile-Token igual a
+        "profile_token": refresca bajo cProfile y devuelve el resumen del perfil.
+        El token no va en la URL: log_message imprime la línea del request entera."""
+        cfg   = load_config()
+        # http.server decodifica los headers como latin-1: se comparan los bytes tal como llegaron
+        token = self.headers.get("X-Profile-Token", "")
+        if not cfg.get("profile_token") or not hmac.compare_digest(
+                token.encode("latin-1", "replace"), str(cfg["profile_token"]).encode("utf-8")):
+            self._json({"error": "Perfilado deshabilitado o token inválido"}, 403)
+            return
+        memoria = self.query.get("memoria", ["0"])[0] not in ("", "0")
+        # Fuentes y páginas en serie: cProfile solo ve el hilo que lo llama
+        cfg["http_concurrency"] = cfg["source_concurrency"] = 1
+        # Por Snapshot.refresh: el perfilado es un refresh más (single-flight, historial y métricas)
+        perfil = {}
+        def build(cfg):
+            result, perfil["resumen"] = perfilar(lambda: fetch_all(cfg), "servidor", memoria=memoria)
+            return result
         try:
-            with open(path, "rb") as f:
-                data = f.read()
-            self.send_response(200)
-            self.send_header("Content-Type", ct)
-            self.send_header("Content-Length", len(data))
-            self.end_headers()
-            self.wfile.write(data)
+            SNAPSHOT.refresh(cfg, build)
+        except PerfilEnCurso as e:
+            self._json({"error": str(e)}, 409)
+            return
+        except Exception as e:
+            traceback.print_exc()
+            self._json({"error": str(e)}, 500)
+            return
+        if "resumen" not in perfil:
+            self._json({"error": "Sin credenciales: no hay nada que perfilar"}, 409)
+            return
+        self._json(perfil["resumen"])
+
+    def _handle_stream(self):
+        """/api/stream: Server-Sent Events; evento "cambios" con los clientes, proyectos
+        y tareas que cambiaron en cada refresh. La conexión queda en manos de STREAM."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        self.server.detach(self.connection)
+        STREAM.add(self.connection)
+
+    def _handle_metrics(self):
+        """/api/metrics en formato Prometheus; ?format=json (o Accept: application/json) → JSON"""
+        clients, _ = SNAPSHOT.get()
+        METRICS.set("snapshot_age_seconds", SNAPSHOT.age() or 0)
+        METRICS.set("snapshot_tasks", sum(c["kpis"]["total_tareas"] for c in clients or ()))
+        METRICS.set("sse_connections", STREAM.count())
+        if self.query.get("format", [""])[0] == "json" or \
+                "application/json" in self.headers.get("Accept", ""):
+            self._json(METRICS.as_dict())
+        else:
+            self._send(METRICS.prometheus().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+
+    def _handle_history(self):
+        """/api/history?cliente=X[&proyecto=Y] o ?tarea=KEY → {"ts": [...], "valores": {kpi: [...]}}"""
+        arg  = lambda k: self.query.get(k, [""])[0]
+        hist = historial(load_config())
+        if hist is None:
+            self._json({"error": "El historial está desactivado (history_file)"}, 404)
+        elif not (arg("cliente") or arg("tarea")):
+            self._json({"error": "Falta cliente (o tarea)"}, 400)
+        else:
+            self._json(hist.series(arg("cliente"), arg("proyecto"), arg("tarea")))
+
+    def _ensure_snapshot(self):
+        """Sin snapshot todavía, refresca de forma síncrona; False si ya contestó el error."""
+        if SNAPSHOT.body()[0] is not None:
+            return True
+        if not has_credentials(load_config()):
+            self._json({"error": "No hay credenciales configuradas"}, 400)
+            return False
+        try:
+            SNAPSHOT.refresh()
+            return True
+        except Exception as e:
+            traceback.print_exc()
+            self._json({"error": str(e)}, 500)
+            return False
+
+    def _handle_part(self, cliente=None):
+        """/api/summary[?force=1] (KPIs de cada cliente, sin proyectos) y /api/clients/<nombre>"""
+        if not self._ensure_snapshot():
+            return
+        if self.query.get("force", ["0"])[0] not in ("", "0"):
+            try:
+                SNAPSHOT.refresh()
+            except Exception as e:
+                traceback.print_exc()
+                self._json({"error": str(e)}, 500)
+                return
+        payload, etag = SNAPSHOT.part(cliente)
+        if payload is None:
+            self._json({"error": f"No existe el cliente {cliente}"}, 404)
+            return
+        self._send(payload, "application/json; charset=utf-8", etag=etag, cors=True,
+                   extra={"X-Snapshot-Age": int(SNAPSHOT.age() or 0)})
+
+    def _handle_tasks(self):
+        """/api/tasks?cliente=&proyecto=&estado=&persona=&sem_fecha=&sem_horas=&q=
+        &desde=YYYY-MM-DD&hasta=YYYY-MM-DD&sort=<columna>&dir=asc|desc&page=1&limit=100"""
+        arg = lambda k, d="": self.query.get(k, [d])[0]
+        if not self._ensure_snapshot():
+            return
+        try:
+            page  = max(1, int(arg("page", "1")))
+            limit = min(1000, max(1, int(arg("limit", "100"))))
+        except ValueError:
+            self._json({"error": "page y limit deben ser enteros"}, 400)
+            return
+        direction = arg("dir", "asc")
+        if direction not in ("asc", "desc"):
+            self._json({"error": "dir debe ser asc o desc"}, 400)
+            return
+
+        index, ts = SNAPSHOT.task_index()
+        # Un invalidate() entre _ensure_snapshot() y acá deja el snapshot vacío: se rearma una vez
+        if index is None:
+            if not self._ensure_snapshot():
+                return
+            index, ts = SNAPSHOT.task_index()
+        if index is None:
+            self._json({"error": "El snapshot se invalidó; reintentá"}, 503)
+            return
+        res = index.query(
+            {k: arg(k) for k in INDEXED},
+            q=arg("q"), desde=arg("desde") or None, hasta=arg("hasta") or None,
+            sort=arg("sort") or None, direction=direction, page=page, limit=limit,
+        )
+        res["ts"] = ts.isoformat()
+        self._json(res)
+
+    def _serve_file(self, url_path):
+        full = STATIC.resolve(url_path)
+        if not full:
+            self.send_error(404)
+            return
+        try:
+            entry = STATIC.get(full)
         except FileNotFoundError:
             self.send_error(404)
+            return
+        if entry["data"] is not None or etag_matches(self.headers.get("If-None-Match"), entry["etag"]):
+            self._send(entry["data"] or b"", entry["ct"], etag=entry["etag"], variants=entry["variants"])
+            return
+
+        # Archivo grande: headers y después sendfile directo del disco al socket
+        with open(full, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self.send_response(200)
+            self.send_header("Content-Type", entry["ct"])
+            self.send_header("Content-Length", size)
+            self.send_header("ETag", entry["etag"])
+            self.end_headers()
+            self.wfile.flush()
+            self.connection.sendfile(f, 0, size)
 
     def _json(self, obj, status=200):
-        data = json.dumps(obj, default=str, ensure_ascii=False).encode("utf-8")
+        t0   = time.perf_counter()
+        data = json.dumps(obj, default=json_default, ensure_ascii=False).encode("utf-8")
+        METRICS.observe("json_encode_seconds", time.perf_counter() - t0, endpoint=self._endpoint())
+        self._send(data, "application/json; charset=utf-8", status, cors=True)
+
+    def _send(self, data, ct, status=200, etag=None, cors=False, extra=None, variants=None):
+        """Envía `data` comprimido según Accept-Encoding (usando `variants` si ya
+        viene comprimido); con ETag contesta 304 si el cliente ya tiene esa versión."""
+        if status == 200 and etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", 0)
+            if cors:
+                self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            return
+
+        enc = pick_encoding(self.headers.get("Accept-Encoding", "")) if len(data) >= COMPRESS_MIN else None
+        if variants is not None:
+            enc  = enc if enc in variants else None
+            data = variants[enc] if enc else data
+        elif enc:
+            data = compress(data, enc, etag)
         self.send_response(status)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
-        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Content-Type", ct)
         self.send_header("Content-Length", len(data))
+        self.send_header("Vary", "Accept-Encoding")
+        if enc:
+            self.send_header("Content-Encoding", enc)
+        if etag:
+            self.send_header("ETag", f'{etag[:-1]}-{enc}"' if enc else etag)
+        if cors:
+            self.send_header("Access-Control-Allow-Origin", "*")
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
         self.end_headers()
         self.wfile.write(data)
 
+    # ── Métricas por request ────────────────────────────────────────
+    ENDPOINTS = ("/api/data", "/api/tasks", "/api/config", "/api/history", "/api/metrics",
+                 "/api/summary", "/api/stream", "/api/mapeos")
+
+    def _endpoint(self):
+        if not self.path:
+            return "invalido"
+        path = urlparse(self.path).path
+        if path in ("/", "/index.html"):
+            return "index"
+        if path.startswith("/api/clients/"):
+            return "/api/clients"
+        return path if path in self.ENDPOINTS else "static"
+
+    def parse_request(self):
+        # Recién acá empieza el request: la espera de una conexión keep-alive no cuenta
+        self._t0, self._status, self._bytes = time.perf_counter(), None, 0
+        return super().parse_request()
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword == "Content-Length":
+            self._bytes = int(value)
+        super().send_header(keyword, value)
+
+    def handle_one_request(self):
+        # Mientras espera el próximo request una conexión keep-alive ocupa un worker
+        # del pool: esa espera (y solo esa) se corta a los KEEPALIVE_SECS
+        self.connection.settimeout(KEEPALIVE_SECS)
+        try:
+            ready = self.rfile.peek(1)
+        except OSError:
+            ready = b""
+        if not ready:
+            self.close_connection = True
+            return
+        self.connection.settimeout(REQUEST_TIMEOUT)
+        # Una línea de request inválida (400) o demasiado larga (414) se contesta sin
+        # pasar por parse_request, o antes de que asigne self.path
+        self._t0, self._status, self._bytes, self.path = time.perf_counter(), None, 0, ""
+        super().handle_one_request()
+        if self._status is not None:
+            ep = self._endpoint()
+            METRICS.observe("http_request_seconds", time.perf_counter() - self._t0, endpoint=ep)
+            METRICS.inc("http_requests_total", endpoint=ep, status=str(self._status))
+            METRICS.inc("http_response_bytes_total", self._bytes, endpoint=ep)
+
     def log_message(self, fmt, *args):
         print(f"[{datetime.now().strftime('%H:%M:%S')}]", fmt % args)
 
 
 if __name__ == "__main__":
-    print(f"\n✅  Dashboard corriendo en http://localhost:{PORT}")
+    workers = int(load_config().get("server_workers", SERVER_WORKERS))
+    print(f"\n✅  Dashboard corriendo en http://localhost:{PORT} ({workers} workers)")
     print(f"    Credenciales en:       {CONFIG_FILE}")
     print("    Ctrl+C para detener\n")
+    SNAPSHOT.preload()
+    STREAM.start()
+    threading.Thread(target=scheduler_loop, args=(SNAPSHOT,), daemon=True).start()
+    threading.Thread(target=vigilar_mapeos, args=(SNAPSHOT,), daemon=True).start()
     try:
-        HTTPServer(("", PORT), Handler).serve_forever()
+        PooledHTTPServer(("", PORT), Handler, workers).serve_forever()
     except KeyboardInterrupt:
         print("\n👋  Servidor detenido")
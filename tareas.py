@@ -0,0 +1,84 @@
+"""
+tareas.py – Representación compacta de una tarea de Jira
+=========================================================
+Usado por servidor.py y process_data.py. Cada tarea es un objeto con
+__slots__ (sin dict por instancia) y los valores que se repiten mucho
+(estado, persona, semáforos) se internan, así miles de tareas comparten
+los mismos strings. El dict/JSON recién se arma al serializar.
+"""
+
+import sys
+
+
+class Tarea:
+    __slots__ = (
+        "id", "resumen", "estado", "persona",
+        "horas_estimadas", "horas_consumidas", "horas_pendientes",
+        "fecha_fin", "fecha_fin_real", "desvio_dias",
+        "sem_fecha", "sem_horas", "es_finalizado",
+    )
+
+    def __init__(self, id, resumen, estado, persona,
+                 horas_estimadas, horas_consumidas, horas_pendientes,
+                 fecha_fin, fecha_fin_real, desvio_dias,
+                 sem_fecha, sem_horas, es_finalizado):
+        self.id               = id
+        self.resumen          = resumen
+        self.estado           = sys.intern(estado)
+        self.persona          = sys.intern(persona)
+        self.horas_estimadas  = horas_estimadas
+        self.horas_consumidas = horas_consumidas
+        self.horas_pendientes = horas_pendientes
+        self.fecha_fin        = fecha_fin          # "YYYY-MM-DD" o None
+        self.fecha_fin_real   = fecha_fin_real
+        self.desvio_dias      = desvio_dias
+        self.sem_fecha        = sys.intern(sem_fecha)
+        self.sem_horas        = sys.intern(sem_horas)
+        self.es_finalizado    = es_finalizado
+
+    def valores(self):
+        """Todos los campos en orden de __slots__ (para comparar versiones de una tarea)."""
+        return tuple(getattr(self, k) for k in self.__slots__)
+
+    def __reduce__(self):
+        # Al pasar entre procesos se reconstruye con __init__ para volver a internar
+        return Tarea, self.valores()
+
+    def as_api_dict(self):
+        """Formato de /api/data (servidor.py → index.html)."""
+        return {
+            "id":               self.id,
+            "resumen":          self.resumen,
+            "estado":           self.estado,
+            "persona":          self.persona,
+            "horas_estimadas":  self.horas_estimadas,
+            "horas_consumidas": self.horas_consumidas,
+            "horas_pendientes": self.horas_pendientes,
+            "fecha_fin":        self.fecha_fin,
+            "fecha_fin_real":   self.fecha_fin_real,
+            "desvio_dias":      self.desvio_dias,
+            "sem_fecha":        self.sem_fecha,
+            "sem_horas":        self.sem_horas,
+        }
+
+    def as_dashboard_dict(self):
+        """Formato de dashboard_data.json (process_data.py)."""
+        return {
+            "id":               self.id,
+            "resumen":          self.resumen,
+            "estado":           self.estado,
+            "persona":          self.persona,
+            "horas_estimadas":  self.horas_estimadas,
+            "horas_consumidas": self.horas_consumidas,
+            "horas_pendientes": self.horas_pendientes,
+            "fecha_fin":        self.fecha_fin,
+            "fecha_fin_real":   self.fecha_fin_real,
+            "desvio_dias":      self.desvio_dias,
+            "sobre_estimacion": self.sem_horas == "rojo",
+            "es_finalizado":    self.es_finalizado,
+            "semaforo_fecha":   self.sem_fecha,
+            "semaforo_horas":   self.sem_horas,
+        }
+
+    def __repr__(self):
+        return f"Tarea({self.id!r}, {self.estado!r}, {self.persona!r})"